@@ -0,0 +1,219 @@
+"""
+Conversion par lot de plusieurs dossiers de mods / dumps.
+Les dossiers sont convertis en parallele dans un pool de processus (un par
+coeur), avec nouvel essai en cas d'echec et bilan final. Utilisable sans
+interface : python migoto_gui.py --batch DOSSIER [DOSSIER ...]
+Ce module n'importe jamais tkinter.
+"""
+
+import os, sys, time, argparse, subprocess, multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import migoto_decode
+import migoto_manifest
+import migoto_obj
+
+
+def script_args(buffers, out_dir, fmt, stride=None):
+    """Arguments du script externe migoto_to_fbx.py (sans l'interpreteur ni le script)."""
+    args = ["--buffers", buffers,
+            "--output",  os.path.join(out_dir, "output.obj"),
+            "--format",  fmt]
+    if stride:
+        args += ["--stride", str(stride)]
+    return args
+
+
+def script_command(script, buffers, out_dir, fmt, stride=None):
+    """Ligne de commande du script externe migoto_to_fbx.py."""
+    return [sys.executable, script] + script_args(buffers, out_dir, fmt, stride)
+
+
+def make_job(folder, output=None, stride=None, fmt='obj', engine='builtin', script=None,
+             force=False):
+    """Description (picklable) d'une conversion. output = dossier racine de sortie."""
+    out_dir = os.path.join(output, os.path.basename(os.path.normpath(folder))) \
+              if output else folder
+    return {'folder': folder, 'out_dir': out_dir, 'stride': stride,
+            'format': fmt, 'engine': engine, 'script': script, 'force': force}
+
+
+def script_state(folder, out_dir, script, fmt, stride):
+    """
+    Etat incremental du moteur script (granularite : le dossier entier).
+    Retourne (a_jour, manifest, inputs, options, version).
+    """
+    manifest = migoto_manifest.Manifest(out_dir)
+    inputs   = manifest.inputs(migoto_manifest.folder_inputs(folder))
+    options  = {'format': fmt, 'stride': stride}
+    version  = migoto_manifest.file_hash(script)
+    fresh    = manifest.up_to_date(migoto_manifest.SCRIPT_KEY, inputs, options, version)
+    return fresh, manifest, inputs, options, version
+
+
+# Fichiers du dossier de sortie qui ne sont pas des sorties du script
+NOT_OUTPUTS = (migoto_manifest.MANIFEST, '.tmp', migoto_obj.CACHE_EXT)
+
+
+def script_outputs(out_dir, since=None):
+    """
+    Fichiers produits (obj, fbx, glb... tout format) ; avec since (time.time()
+    au lancement), ceux ecrits depuis.
+    """
+    outs = []
+    with os.scandir(out_dir) as it:
+        for e in it:
+            if e.name.endswith(NOT_OUTPUTS) or not e.is_file():
+                continue
+            # 1 s de marge : dates des fichiers moins fines que l'horloge
+            if since is None or e.stat().st_mtime >= since - 1:
+                outs.append(e.path)
+    return sorted(outs)
+
+
+# =============================================================================
+# TRAVAIL D'UN PROCESSUS
+# =============================================================================
+
+def convert_job(job):
+    """Convertit un dossier ; ne leve pas, l'erreur est dans le resultat."""
+    t0 = time.perf_counter()
+    lines = []
+    res = {'folder': job['folder'], 'status': 'ok', 'outputs': [],
+           'log': lines, 'error': None, 'time': 0.0}
+    try:
+        os.makedirs(job['out_dir'], exist_ok=True)
+        if job['engine'] == 'script':
+            fresh, manifest, inputs, options, version = script_state(
+                job['folder'], job['out_dir'], job['script'], job['format'], job['stride'])
+            if fresh and not job['force']:
+                res['outputs'] = manifest.outputs(migoto_manifest.SCRIPT_KEY)
+                lines.append(f"[OK] 0 reconstruit(s), {len(res['outputs'])} a jour")
+                res['time'] = time.perf_counter() - t0
+                return res
+            started = time.time()
+            proc = subprocess.run(script_command(job['script'], job['folder'], job['out_dir'],
+                                                 job['format'], job['stride']),
+                                  stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                  text=True, encoding='utf-8', errors='replace')
+            lines += [l for l in proc.stdout.splitlines() if l.strip()]
+            if proc.returncode:
+                raise RuntimeError(f"code de retour {proc.returncode}")
+            res['outputs'] = script_outputs(job['out_dir'], started)
+            manifest.record(migoto_manifest.SCRIPT_KEY, inputs, options, version,
+                            res['outputs'])
+            manifest.save()
+        else:
+            done = migoto_decode.convert_folder(job['folder'], job['out_dir'],
+                                                job['stride'], lines.append, job['force'],
+                                                job['format'])
+            res['outputs'] = [p for p, _, _ in done]
+            if not done:
+                raise RuntimeError("aucun mesh converti")
+    except Exception as e:
+        res['status'], res['error'] = 'err', str(e)
+    res['time'] = time.perf_counter() - t0
+    return res
+
+
+# =============================================================================
+# FILE DE TRAVAUX
+# =============================================================================
+
+def run_batch(jobs, workers=None, retries=1, on_event=None):
+    """
+    Execute les travaux sur un pool de processus.
+    on_event(index, statut, resultat) : 'queued', 'retry', 'ok' ou 'err'.
+    Retourne le bilan {'ok', 'err', 'time', 'results'}.
+    """
+    emit = on_event or (lambda i, status, res: None)
+    t0 = time.perf_counter()
+    results = [None]*len(jobs)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs) or 1))
+    # spawn partout : pas de fork d'un processus qui a des threads (GUI)
+    ctx = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        pending = {}
+        for i, job in enumerate(jobs):
+            pending[pool.submit(convert_job, job)] = (i, 0)
+            emit(i, 'queued', None)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                i, attempt = pending.pop(fut)
+                try:
+                    res = fut.result()
+                except Exception as e:      # processus mort (BrokenProcessPool...)
+                    res = {'folder': jobs[i]['folder'], 'status': 'err', 'outputs': [],
+                           'log': [], 'error': str(e) or type(e).__name__, 'time': 0.0}
+                if res['status'] == 'err' and attempt < retries:
+                    emit(i, 'retry', res)
+                    try:
+                        pending[pool.submit(convert_job, jobs[i])] = (i, attempt+1)
+                        continue
+                    except RuntimeError:    # pool casse : plus de nouvel essai
+                        pass
+                results[i] = res
+                emit(i, res['status'], res)
+    return {'ok':      sum(r['status'] == 'ok' for r in results),
+            'err':     sum(r['status'] != 'ok' for r in results),
+            'time':    time.perf_counter() - t0,
+            'results': results}
+
+
+# =============================================================================
+# LIGNE DE COMMANDE
+# =============================================================================
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog='migoto_gui.py --batch',
+                                description="Conversion par lot sans interface")
+    p.add_argument('--batch', nargs='+', required=True, metavar='DOSSIER',
+                   help="dossiers de buffers a convertir")
+    p.add_argument('--output',  help="dossier racine de sortie (defaut : chaque dossier)")
+    p.add_argument('--stride',  type=int, help="stride force (defaut : detection)")
+    p.add_argument('--format',  default='obj', choices=['all', 'obj', 'gltf', 'fbx'])
+    p.add_argument('--engine',  default='builtin', choices=['builtin', 'script'])
+    p.add_argument('--script',  help="chemin de migoto_to_fbx.py (moteur script)")
+    p.add_argument('--jobs',    type=int, help="processus paralleles (defaut : nb de coeurs)")
+    p.add_argument('--retries', type=int, default=1)
+    p.add_argument('--force',   action='store_true',
+                   help="tout reconvertir, meme ce qui est a jour")
+    args = p.parse_args(argv)
+
+    if args.engine == 'script' and not (args.script and os.path.isfile(args.script)):
+        print("[ERR] Script introuvable !"); return 2
+    folders = [d for d in args.batch if os.path.isdir(d)]
+    missing = sorted(set(args.batch) - set(folders))
+    for d in missing:
+        print(f"[WARN] {d}: dossier introuvable, SKIP")
+    if not folders:
+        print("[ERR] Aucun dossier a convertir !"); return 2
+    jobs = [make_job(d, args.output, args.stride, args.format, args.engine, args.script,
+                     args.force)
+            for d in folders]
+
+    def on_event(i, status, res):
+        name = jobs[i]['folder']
+        if status == 'ok':
+            print(f"[OK] {name}: {len(res['outputs'])} fichier(s), {res['time']:.1f} s"
+                  + (f" - {res['log'][-1][5:]}" if res['log'] else ''))
+        elif status == 'err':
+            print(f"[ERR] {name}: {res['error']}")
+            for line in res['log'][-5:]: print(f"      {line}")
+        elif status == 'retry':
+            print(f"[WARN] {name}: {res['error']} - nouvel essai")
+        sys.stdout.flush()
+
+    # Les workers (spawn) re-importent __main__ : on leur donne ce module
+    # plutot que migoto_gui, pour que tkinter ne soit jamais importe
+    sys.modules['__main__'] = sys.modules[__name__]
+    summary = run_batch(jobs, args.jobs, args.retries, on_event)
+    print(f"\nLot termine : {summary['ok']} OK, {summary['err']} erreur(s), "
+          f"{summary['time']:.1f} s")
+    # Dossier manquant ou travail en erreur : echec pour un script appelant
+    return 0 if summary['err'] == 0 and not missing else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,215 @@
+"""
+Bancs de mesure sans affichage : chargement OBJ, normalisation, scene,
+projection/culling/tri, rasterisation et conversion de dumps 3DMigoto
+synthetiques (tailles et strides parametrables).
+
+  python migoto_bench.py --sizes 10000,100000 --out bench.json
+  python migoto_bench.py --compare bench.json --threshold 0.2
+
+En mode comparaison, le code de retour est 1 si une etape a regresse de
+plus du seuil par rapport a la reference.
+"""
+
+import os, sys, json, time, shutil, argparse, platform, tempfile
+
+import numpy as np
+
+import migoto_decode
+import migoto_export
+import migoto_mesh
+import migoto_obj
+import migoto_render as render
+import migoto_stride
+
+SIZES   = (10000, 100000, 1000000)
+STRIDES = (12, 24, 40)
+VIEW    = (20.0, 30.0, 1.0, 0.0, 0.0, 800, 600)   # rot_x, rot_y, zoom, pan_x, pan_y, w, h
+NOISE   = 1e-3   # s : ecart absolu sous lequel une difference n'est pas une regression
+
+
+# =============================================================================
+# DONNEES SYNTHETIQUES
+# =============================================================================
+
+def torus(ntris):
+    """Tore ferme d'environ ntris triangles -> (verts float32 (N,3), tris uint32 (M,3))."""
+    nu = max(3, int(np.sqrt(ntris)))
+    nv = max(3, ntris // (2*nu))
+    u, v = np.meshgrid(np.linspace(0, 2*np.pi, nu, endpoint=False),
+                       np.linspace(0, 2*np.pi, nv, endpoint=False), indexing='ij')
+    r = 1 + 0.35*np.cos(v)
+    verts = np.stack([r*np.cos(u), 0.35*np.sin(v), r*np.sin(u)], -1).reshape(-1, 3)
+    i, j = np.meshgrid(np.arange(nu), np.arange(nv), indexing='ij')
+    a, b = i*nv + j, ((i+1) % nu)*nv + j
+    c, d = ((i+1) % nu)*nv + (j+1) % nv, i*nv + (j+1) % nv
+    tris = np.concatenate([np.stack([a, b, c], -1).reshape(-1, 3),
+                           np.stack([a, c, d], -1).reshape(-1, 3)])
+    return verts.astype(np.float32), tris.astype(np.uint32)
+
+
+def write_dump(folder, verts, tris, stride, name='Bench'):
+    """.buf / .ib / .ini / .fmt d'un mesh, layout POSITION [NORMAL] [TEXCOORD] puis bourrage."""
+    os.makedirs(folder, exist_ok=True)
+    fields = [('POSITION', 'R32G32B32_FLOAT', 0, verts)]
+    if stride >= 24:
+        nrm = verts / np.maximum(np.linalg.norm(verts, axis=1, keepdims=True), 1e-12)
+        fields.append(('NORMAL', 'R32G32B32_FLOAT', 12, nrm))
+    if stride >= 32:
+        fields.append(('TEXCOORD', 'R32G32_FLOAT', 24, verts[:, :2]*0.5 + 0.5))
+    raw = np.zeros((len(verts), stride), np.uint8)
+    for _, _, off, arr in fields:
+        a = np.ascontiguousarray(arr, '<f4')
+        raw[:, off:off + a.shape[1]*4] = a.view(np.uint8).reshape(len(verts), -1)
+    raw.tofile(os.path.join(folder, f"{name}.buf"))
+    ib_fmt = 'R16_UINT' if len(verts) <= 0xFFFF else 'R32_UINT'
+    tris.astype(migoto_decode.INDEX_FORMATS[ib_fmt]).tofile(os.path.join(folder, f"{name}.ib"))
+    with open(os.path.join(folder, 'mod.ini'), 'w', encoding='utf-8') as f:
+        f.write(f"[Resource{name}VB]\ntype = Buffer\nstride = {stride}\nfilename = {name}.buf\n"
+                f"[Resource{name}IB]\ntype = Buffer\nformat = DXGI_FORMAT_{ib_fmt}\n"
+                f"filename = {name}.ib\n")
+    with open(os.path.join(folder, f"{name}.fmt"), 'w', encoding='utf-8') as f:
+        f.write(f"stride: {stride}\ntopology: trianglelist\nformat: DXGI_FORMAT_{ib_fmt}\n")
+        for k, (sem, fmt, off, _) in enumerate(fields):
+            f.write(f"element[{k}]:\n  SemanticName: {sem}\n  SemanticIndex: 0\n"
+                    f"  Format: {fmt}\n  InputSlot: 0\n  AlignedByteOffset: {off}\n")
+    return os.path.join(folder, f"{name}.buf"), os.path.join(folder, f"{name}.ib")
+
+
+# =============================================================================
+# MESURES
+# =============================================================================
+
+def timeit(fn, repeat, setup=None):
+    """Meilleur temps (s) sur repeat executions ; setup() fournit l'argument de fn."""
+    best = float('inf')
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        t0 = time.perf_counter()
+        fn(arg) if setup else fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench_mesh(size, tmp, repeat):
+    """Etapes visionneuse sur un tore de size triangles : {etape: s}."""
+    verts, tris = torus(size)
+    mesh = {'name': 'bench', 'positions': verts, 'indices': tris}
+    obj = os.path.join(tmp, f"bench_{size}.obj")
+    out = {'export_obj': timeit(lambda: migoto_export.write_obj(obj, mesh), repeat),
+           'export_glb': timeit(lambda: migoto_export.write_glb(obj[:-4] + '.glb', mesh),
+                                repeat),
+           'load_obj':   timeit(lambda: migoto_obj.load_obj(obj, use_cache=False), repeat)}
+    migoto_obj.load_obj(obj)                       # cree le .vcache
+    out['load_obj_cached'] = timeit(lambda: migoto_obj.load_obj(obj), repeat)
+    out['normalize'] = timeit(render.normalize, repeat, setup=verts.copy)
+    v = verts.copy()
+    render.normalize(v)
+    store = migoto_mesh.MeshStore.single(v, tris)
+    out['scene'] = timeit(lambda: render.build_scene(store), repeat)
+    scene = render.build_scene(store)
+    out['lods']  = timeit(lambda: render.build_lods(scene), repeat)
+    out['frame_poly']   = timeit(lambda: render.render_frame(scene, *VIEW), repeat)
+    out['frame_raster'] = timeit(lambda: render.render_raster(scene, *VIEW, '#0d0d1a',
+                                                              '#1e1e3a'), repeat)
+    return out
+
+
+def bench_dump(size, stride, tmp, repeat):
+    """Etapes conversion d'un dump synthetique : {etape: s}."""
+    verts, tris = torus(size)
+    folder = os.path.join(tmp, f"dump_{size}_{stride}")
+    buf, ib = write_dump(folder, verts, tris, stride)
+    nolog = lambda line: None
+    out = {'stride': timeit(lambda: migoto_stride.detect_stride(buf, [ib], use_cache=False),
+                            repeat)}
+    mesh = migoto_decode.find_meshes(folder, stride, nolog)[0]
+    out['decode']  = timeit(lambda: migoto_decode.decode_mesh(mesh), repeat)
+    # Cache des meshes decodes vide a chaque execution : mesure le decodage, pas le cache
+    fresh = lambda: tempfile.mkdtemp(prefix='meshes_', dir=tmp)
+    def convert(meshes):
+        migoto_decode.MESH_CACHE_DIR = meshes
+        migoto_decode.convert_folder(folder, os.path.join(folder, 'out'), None, nolog, True, 'all')
+    out['convert'] = timeit(convert, repeat, setup=fresh)
+    return out
+
+
+def run(sizes=SIZES, strides=STRIDES, repeat=3, log=print, keep=False):
+    """Toutes les mesures -> {'meta', 'results': {'etape@taille[/sN]': s}}."""
+    tmp = tempfile.mkdtemp(prefix='migoto_bench_')
+    # Caches (strides detectes...) dans le dossier temporaire : mesures reproductibles
+    cache_dir, migoto_decode.CACHE_DIR = migoto_decode.CACHE_DIR, os.path.join(tmp, 'cache')
+    results = {}
+    try:
+        for size in sizes:
+            stages = [(f"{k}@{size}", t) for k, t in bench_mesh(size, tmp, repeat).items()]
+            for stride in strides:
+                stages += [(f"{k}@{size}/s{stride}", t)
+                           for k, t in bench_dump(size, stride, tmp, repeat).items()]
+            for key, t in stages:
+                results[key] = t
+                log(f"{key:<28} {t*1e3:10.2f} ms")
+    finally:
+        migoto_decode.CACHE_DIR, migoto_decode.MESH_CACHE_DIR = cache_dir, None
+        if not keep: shutil.rmtree(tmp, ignore_errors=True)
+    meta = {'python': platform.python_version(), 'numpy': np.__version__,
+            'machine': platform.machine(), 'system': platform.system(),
+            'cpus': os.cpu_count(), 'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'repeat': repeat}
+    return {'meta': meta, 'results': results}
+
+
+def compare(base, new, threshold=0.2, log=print):
+    """Liste des etapes plus lentes que base de plus de threshold (relatif)."""
+    worse = []
+    for key in sorted(set(base['results']) & set(new['results'])):
+        b, n = base['results'][key], new['results'][key]
+        ratio = n / b if b else float('inf')
+        bad = n > b*(1 + threshold) and n - b > NOISE
+        if bad: worse.append(key)
+        log(f"{'[ERR]' if bad else '[OK] '} {key:<28} {b*1e3:10.2f} -> {n*1e3:10.2f} ms"
+            f"  x{ratio:.2f}")
+    for key in sorted(set(base['results']) - set(new['results'])):
+        log(f"[WARN] {key}: absent de la nouvelle mesure")
+    return worse
+
+
+# =============================================================================
+# LIGNE DE COMMANDE
+# =============================================================================
+
+def _ints(text):
+    return tuple(int(x) for x in text.split(',') if x.strip())
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog='migoto_bench.py', description="Bancs de mesure")
+    p.add_argument('--sizes',   type=_ints, default=SIZES,
+                   help="triangles par mesh, separes par des virgules")
+    p.add_argument('--strides', type=_ints, default=STRIDES,
+                   help="strides des dumps synthetiques")
+    p.add_argument('--repeat',  type=int, default=3, help="executions par etape (meilleur temps)")
+    p.add_argument('--out',     help="fichier JSON des resultats")
+    p.add_argument('--compare', metavar='REFERENCE', help="JSON de reference a comparer")
+    p.add_argument('--threshold', type=float, default=0.2,
+                   help="regression toleree (0.2 = 20 %% plus lent)")
+    p.add_argument('--keep',    action='store_true', help="garder les fichiers generes")
+    args = p.parse_args(argv)
+
+    res = run(args.sizes, args.strides, args.repeat, keep=args.keep)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(res, f, indent=1)
+        print(f"[OK] Resultats : {args.out}")
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            base = json.load(f)
+        worse = compare(base, res, args.threshold)
+        if worse:
+            print(f"[ERR] {len(worse)} etape(s) en regression (> {args.threshold:.0%})")
+            return 1
+        print("[OK] Aucune regression")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,185 @@
+"""
+Cache memoire LRU borne en octets (meshes prepares pour la visionneuse).
+Les entrees les moins recemment utilisees sont evincees des que la taille
+totale depasse le budget. Utilisable depuis plusieurs threads.
+DiskCache : meme principe sur disque, pour les meshes decodes adresses par
+leur contenu (partages entre conversion et visionneuse).
+"""
+
+import os, io, zipfile, threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Budget par defaut ; MIGOTO_MESH_CACHE_MB pour le changer
+BUDGET = int(os.environ.get('MIGOTO_MESH_CACHE_MB') or 512) << 20
+# Budget disque ; MIGOTO_DISK_CACHE_MB pour le changer
+DISK_BUDGET = int(os.environ.get('MIGOTO_DISK_CACHE_MB') or 2048) << 20
+
+
+def nbytes(obj, _seen=None):
+    """
+    Octets des tableaux NumPy contenus dans obj (dict/list/tuple, attributs
+    des objets a __slots__ comme MeshStore), sans doublon : une vue compte
+    pour le tableau dont elle depend, une seule fois.
+    """
+    seen = set() if _seen is None else _seen
+    while isinstance(obj, np.ndarray) and isinstance(obj.base, np.ndarray):
+        obj = obj.base
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if hasattr(type(obj), '__slots__'):
+        return sum(nbytes(getattr(obj, k, None), seen) for k in type(obj).__slots__)
+    if isinstance(obj, dict):
+        return sum(nbytes(v, seen) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(nbytes(v, seen) for v in obj)
+    return 0
+
+
+def file_key(path):
+    """Cle d'un fichier : change si le fichier est reecrit."""
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+
+class LRUCache:
+    """Cle -> valeur, evincement par taille (octets) et non par nombre d'entrees."""
+
+    def __init__(self, budget=BUDGET):
+        self.budget = budget
+        self.size   = 0
+        self._items = OrderedDict()   # cle -> (valeur, octets)
+        self._lock  = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return default
+            self._items.move_to_end(key)
+            return item[0]
+
+    def put(self, key, value, size=None):
+        size = nbytes(value) if size is None else size
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= old[1]
+            if size > self.budget:         # ne tiendra jamais : pas garde
+                return
+            self._items[key] = (value, size)
+            self.size += size
+            while self.size > self.budget:
+                _, (_, s) = self._items.popitem(last=False)
+                self.size -= s
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+
+class DiskCache:
+    """
+    Cle -> tableaux NumPy nommes, un .npz par cle dans folder. La date du
+    fichier sert de date d'utilisation ; les plus anciens sont supprimes
+    quand le dossier depasse le budget. La taille totale est tenue en memoire
+    (un seul parcours du dossier a la creation) : le dossier n'est reparcouru
+    que pour evincer.
+    """
+
+    def __init__(self, folder, budget=DISK_BUDGET):
+        self.folder = folder
+        self.budget = budget
+        self._lock  = threading.Lock()
+        self.size   = sum(s for _, s, _ in self._files())
+
+    def _path(self, key):
+        return os.path.join(self.folder, f"{key}.npz")
+
+    def _files(self):
+        """(date, taille, chemin) de chaque entree, un stat par fichier."""
+        files = []
+        try:
+            with os.scandir(self.folder) as it:
+                for e in it:
+                    if not e.name.endswith('.npz'): continue
+                    try: st = e.stat()
+                    except OSError: continue
+                    files.append((st.st_mtime_ns, st.st_size, e.path))
+        except OSError:
+            pass
+        return files
+
+    def __contains__(self, key):
+        return os.path.isfile(self._path(key))
+
+    def get(self, key):
+        """{nom: tableau} ou None (absent ou illisible)."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            with np.load(io.BytesIO(data), allow_pickle=False) as z:
+                arrays = {k: z[k] for k in z.files}
+        except (ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            # Entree tronquee ou corrompue : supprimee, le mesh sera redecode
+            self._remove(path)
+            return None
+        try: os.utime(path)
+        except OSError: pass
+        return arrays
+
+    def _remove(self, path):
+        with self._lock:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+                self.size -= size
+            except OSError:
+                pass
+
+    def put(self, key, arrays):
+        """Ecrit arrays ({nom: tableau}, None ignores) puis evince si besoin."""
+        os.makedirs(self.folder, exist_ok=True)
+        path = self._path(key)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            np.savez(f, **{k: v for k, v in arrays.items() if v is not None})
+            size = f.tell()
+        with self._lock:
+            try: size -= os.path.getsize(path)     # entree remplacee
+            except OSError: pass
+            os.replace(tmp, path)
+            self.size += size
+            over = self.size > self.budget
+        if over:
+            self.evict()
+
+    def evict(self):
+        with self._lock:
+            files = self._files()
+            total = sum(s for _, s, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.budget:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+            self.size = total
@@ -0,0 +1,529 @@
+"""
+Decodage integre des buffers 3DMigoto (.ib / .buf) sans script externe.
+Le layout (formats, offsets, stride) est lu dans les .ini / .fmt / .txt du
+dossier ; les buffers sont mappes en memoire et exposes en vues NumPy via un
+dtype structure : aucune copie tant qu'on ne modifie pas les donnees.
+"""
+
+import os, re, json, hashlib
+
+import numpy as np
+
+import migoto_cache
+import migoto_export
+import migoto_manifest
+
+# A incrementer quand la sortie change : invalide les manifestes existants
+CONVERTER_VERSION = 2
+
+# DXGI -> (dtype numpy d'une composante, nb de composantes)
+FORMATS = {
+    'R32G32B32A32_FLOAT': ('<f4', 4), 'R32G32B32_FLOAT': ('<f4', 3),
+    'R32G32_FLOAT':       ('<f4', 2), 'R32_FLOAT':       ('<f4', 1),
+    'R16G16B16A16_FLOAT': ('<f2', 4), 'R16G16_FLOAT':    ('<f2', 2),
+    'R16_FLOAT':          ('<f2', 1),
+    'R32G32B32A32_UINT':  ('<u4', 4), 'R32G32B32A32_SINT': ('<i4', 4),
+    'R32G32B32_UINT':     ('<u4', 3), 'R32G32_UINT':     ('<u4', 2),
+    'R32_UINT':           ('<u4', 1), 'R32_SINT':        ('<i4', 1),
+    'R16G16B16A16_UNORM': ('<u2', 4), 'R16G16B16A16_SNORM': ('<i2', 4),
+    'R16G16B16A16_UINT':  ('<u2', 4), 'R16G16B16A16_SINT':  ('<i2', 4),
+    'R16G16_UNORM':       ('<u2', 2), 'R16G16_SNORM':    ('<i2', 2),
+    'R16_UINT':           ('<u2', 1),
+    'R8G8B8A8_UNORM':     ('u1', 4),  'R8G8B8A8_SNORM':  ('i1', 4),
+    'R8G8B8A8_UINT':      ('u1', 4),  'R8G8B8A8_SINT':   ('i1', 4),
+    'B8G8R8A8_UNORM':     ('u1', 4),  'R10G10B10A2_UNORM': ('<u4', 1),
+}
+
+INDEX_FORMATS = {'R16_UINT': '<u2', 'R32_UINT': '<u4'}
+
+APPEND = 0xFFFFFFFF   # D3D11_APPEND_ALIGNED_ELEMENT
+
+# Caches partages (strides detectes, index de dumps...)
+CACHE_DIR = os.environ.get('MIGOTO_CACHE_DIR') or \
+            os.path.join(os.path.expanduser('~'), '.migoto_gui')
+
+# Ordre des buffers decoupes des mods (Position / Texcoord / Blend)
+_SLOT_NAMES = ('position', 'texcoord', 'blend')
+_RE_SUFFIX  = re.compile(r'[-_ .]?(ib|vb\d?|position|texcoord|blend|color)$', re.I)
+_RE_DRAW    = re.compile(r'^(\d{6})-')
+_RE_VB      = re.compile(r'-vb\d+=', re.I)
+_RE_DATA    = re.compile(r'^(vb\d+\[\d+\]|\d+\s+\d+\s+\d+$)', re.I)
+
+
+def _fmt(name):
+    name = (name or '').strip().upper()
+    return name[len('DXGI_FORMAT_'):] if name.startswith('DXGI_FORMAT_') else name
+
+
+def cache_path(name):
+    """Chemin d'un fichier du dossier de cache (cree a la demande)."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return os.path.join(CACHE_DIR, name)
+
+
+# Meshes decodes adresses par contenu ; None = dossier meshes/ de CACHE_DIR
+MESH_CACHE_DIR = None
+
+
+_mesh_caches = {}   # dossier -> DiskCache (sa taille totale est tenue en memoire)
+
+
+def mesh_cache():
+    """Cache disque des meshes decodes (voir content_key), un par dossier."""
+    folder = MESH_CACHE_DIR or os.path.join(CACHE_DIR, 'meshes')
+    cache = _mesh_caches.get(folder)
+    if cache is None:
+        cache = _mesh_caches.setdefault(folder, migoto_cache.DiskCache(folder))
+    return cache
+
+
+def _int(val, default=None):
+    try: return int(str(val).strip(), 0)
+    except ValueError: return default
+
+
+# =============================================================================
+# LAYOUT (.ini / .fmt / .txt)
+# =============================================================================
+
+def parse_layout(path):
+    """
+    Lit un fichier de layout 3DMigoto. Accepte les sections [Resource*] des
+    .ini (type, stride, format, filename), les liaisons ib / vbN des
+    [TextureOverride*] et les blocs element[N] des .fmt / .txt de
+    FrameAnalysis ('cle: valeur' ou 'cle = valeur').
+    Retourne {'stride', 'format', 'elements', 'resources', 'bindings'} ;
+    bindings = [('ib' ou slot, nom de la ressource)].
+    """
+    out = {'stride': None, 'format': None, 'elements': [], 'resources': {}, 'bindings': []}
+    section = elem = None
+    with open(path, encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            line = line.split(';', 1)[0].strip()
+            if not line: continue
+            if _RE_DATA.match(line): break   # donnees des dumps .txt : en-tete fini
+            if line.startswith('[') and line.endswith(']'):
+                section, elem = line[1:-1].strip(), None
+                continue
+            m = re.match(r'element\[(\d+)\]', line, re.I)
+            if m:
+                elem = {'name': '', 'index': 0, 'format': '', 'offset': APPEND, 'slot': 0}
+                out['elements'].append(elem)
+                continue
+            key, sep, val = line.partition('=') if '=' in line else line.partition(':')
+            if not sep: continue
+            key, val = key.strip().lower(), val.strip()
+            if elem is not None and key in ('semanticname', 'semanticindex', 'format',
+                                            'alignedbyteoffset', 'inputslot'):
+                if   key == 'semanticname':      elem['name']   = val.upper()
+                elif key == 'semanticindex':     elem['index']  = _int(val, 0)
+                elif key == 'format':            elem['format'] = _fmt(val)
+                elif key == 'alignedbyteoffset': elem['offset'] = _int(val, APPEND)
+                elif key == 'inputslot':         elem['slot']   = _int(val, 0)
+                continue
+            if section and section.lower().startswith('textureoverride'):
+                m = re.fullmatch(r'vb(\d+)', key)
+                if key == 'ib' and val.lower() != 'null': out['bindings'].append(('ib', val))
+                elif m:                                   out['bindings'].append((int(m.group(1)), val))
+            elif section and section.lower().startswith('resource'):
+                res = out['resources'].setdefault(section, {})
+                if key in ('stride',):  res['stride']   = _int(val)
+                elif key == 'format':   res['format']   = _fmt(val)
+                elif key == 'filename': res['filename'] = val.replace('\\', '/')
+                elif key == 'type':     res['type']     = val
+            elif key == 'stride':       out['stride'] = _int(val)
+            elif key == 'format':       out['format'] = _fmt(val)
+    # Offsets "append aligned" -> fin de l'element precedent du meme slot
+    ends = {}
+    for e in out['elements']:
+        if e['offset'] == APPEND:
+            e['offset'] = ends.get(e['slot'], 0)
+        base, n = FORMATS.get(e['format'], ('u1', 0))
+        ends[e['slot']] = e['offset'] + np.dtype(base).itemsize*n
+    return out
+
+
+def field_name(elem):
+    return elem['name'] + (str(elem['index']) if elem['index'] else '')
+
+
+def layout_dtype(elements, stride):
+    """dtype structure d'un sommet ; les elements au format inconnu sont ignores."""
+    names, formats, offsets = [], [], []
+    for e in elements:
+        if e['format'] not in FORMATS: continue
+        base, n = FORMATS[e['format']]
+        if e['offset'] + np.dtype(base).itemsize*n > stride: continue
+        names.append(field_name(e))
+        formats.append((base, (n,)) if n > 1 else base)
+        offsets.append(e['offset'])
+    return np.dtype({'names': names, 'formats': formats,
+                     'offsets': offsets, 'itemsize': stride})
+
+
+def default_elements(slot):
+    """Sans layout declare : position float3 en tete du buffer de positions."""
+    if slot != 0:
+        return []
+    return [{'name': 'POSITION', 'index': 0, 'format': 'R32G32B32_FLOAT',
+             'offset': 0, 'slot': 0}]
+
+
+# =============================================================================
+# BUFFERS MAPPES
+# =============================================================================
+
+def map_vertices(path, dtype):
+    """Vue structuree (memmap) d'un .buf ; les octets en trop en fin sont ignores."""
+    n = os.path.getsize(path) // dtype.itemsize
+    if n == 0:
+        return np.zeros(0, dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(n,))
+
+
+def guess_index_format(path, n_verts=None):
+    """R16 ou R32 : taille du fichier, puis indice max coherent avec les sommets."""
+    size = os.path.getsize(path)
+    if size % 4:
+        return 'R16_UINT'
+    if n_verts:
+        r32 = np.memmap(path, dtype='<u4', mode='r') if size else np.zeros(0, '<u4')
+        if len(r32) and int(r32.max()) >= n_verts:
+            return 'R16_UINT'
+    return 'R32_UINT'
+
+
+def map_indices(path, fmt):
+    """Triangles (n,3) mappes depuis un .ib ; un reste incomplet est ignore."""
+    dt = np.dtype(INDEX_FORMATS.get(fmt, '<u4'))
+    n = os.path.getsize(path) // (dt.itemsize*3)
+    if n == 0:
+        return np.zeros((0, 3), dt)
+    return np.memmap(path, dtype=dt, mode='r', shape=(n, 3))
+
+
+class DrawBuffers:
+    """Un mesh : un .ib et un ou plusieurs .buf (slots), decodes a la demande."""
+
+    def __init__(self, key, ib_path, ib_format=None):
+        self.key       = key
+        self.ib_path   = ib_path
+        self.ib_format = ib_format
+        self.vbs       = {}    # slot -> (chemin, stride, elements)
+        self.sources   = [ib_path]   # fichiers d'entree (buffers + layouts)
+        self._arrays   = {}
+
+    def add_vb(self, slot, path, stride, elements):
+        self.vbs[slot] = (path, stride, elements)
+        self.sources.append(path)
+
+    def add_source(self, path):
+        if path and path not in self.sources:
+            self.sources.append(path)
+
+    def vertices(self, slot=0):
+        if slot not in self._arrays:
+            path, stride, elements = self.vbs[slot]
+            self._arrays[slot] = map_vertices(path, layout_dtype(elements, stride))
+        return self._arrays[slot]
+
+    @property
+    def vertex_count(self):
+        return min((len(self.vertices(s)) for s in self.vbs), default=0)
+
+    @property
+    def indices(self):
+        if 'ib' not in self._arrays:
+            fmt = self.ib_format or guess_index_format(self.ib_path, self.vertex_count)
+            self._arrays['ib'] = map_indices(self.ib_path, fmt)
+        return self._arrays['ib']
+
+    def attribute(self, name, index=0):
+        """Vue (sans copie) sur un attribut, ou None s'il n'est pas declare."""
+        field = name + (str(index) if index else '')
+        for slot in sorted(self.vbs):
+            arr = self.vertices(slot)
+            if arr.dtype.names and field in arr.dtype.names:
+                return arr[field]
+        return None
+
+    @property
+    def positions(self): return self.attribute('POSITION')
+    @property
+    def normals(self):   return self.attribute('NORMAL')
+    @property
+    def uvs(self):       return self.attribute('TEXCOORD')
+
+
+# =============================================================================
+# DOSSIER -> MESHES
+# =============================================================================
+
+def group_key(name):
+    """Cle commune a l'.ib et aux .buf d'un meme mesh."""
+    m = _RE_DRAW.match(name)
+    if m:
+        return m.group(1)
+    stem = os.path.splitext(name)[0]
+    return _RE_SUFFIX.sub('', stem) or stem
+
+
+def _is_ib(name):
+    low = name.lower()
+    return low.endswith('.ib') or (low.endswith('.buf') and '-ib=' in low)
+
+
+def _is_vb(name):
+    """
+    .buf de sommets possible. Dans un dump FrameAnalysis, seuls les -vbN= :
+    les constant buffers (-vs-cb0=) et textures (-ps-t0=) sont ignores.
+    """
+    low = name.lower()
+    if not low.endswith('.buf') or _is_ib(name):
+        return False
+    return not _RE_DRAW.match(name) or _RE_VB.search(low) is not None
+
+
+def _slot(name, default=0):
+    low = name.lower()
+    m = re.search(r'vb(\d)', low)
+    if m: return int(m.group(1))
+    for i, s in enumerate(_SLOT_NAMES):
+        if s in low: return i
+    return default
+
+
+def _ini_pairs(inis):
+    """
+    Liaisons des [TextureOverride*] des .ini : ({fichier ib}, {fichier vb:
+    (slot, [cles des meshes servis])}), noms en minuscules. Un jeu de buffers
+    Position/Texcoord/Blend sert tous les .ib dont la cle commence par la
+    sienne (CharPosition.buf -> CharBody.ib, CharHead.ib) ; s'il n'y a qu'un
+    jeu, il sert tous les .ib.
+    """
+    ibs, vbs = {}, {}
+    for lay in inis:
+        res = {name.lower(): r for name, r in lay['resources'].items()}
+        for what, name in lay['bindings']:
+            fname = res.get(name.lower(), {}).get('filename')
+            if not fname: continue
+            fname = os.path.basename(fname).lower()
+            if what == 'ib': ibs[fname] = group_key(fname)
+            else:            vbs.setdefault(fname, _slot(fname, what))
+    sets = {group_key(n).lower() for n in vbs}
+    owner = {}
+    for key in ibs.values():
+        match = [s for s in sets if key.lower().startswith(s)]
+        owner[key] = max(match, key=len) if match else \
+                     next(iter(sets)) if len(sets) == 1 else None
+    return set(ibs), {n: (slot, [k for k, o in owner.items() if o == group_key(n).lower()])
+                      for n, slot in vbs.items()}
+
+
+def find_meshes(folder, stride=None, log=print, keys=None):
+    """
+    Associe les .ib et .buf du dossier et leur layout.
+    stride force le stride du slot 0 ; sinon il est detecte (migoto_stride)
+    en tenant compte des declarations .ini/.fmt/.txt du dossier.
+    Les .ib et .buf sont associes par les liaisons ib / vbN des .ini (un jeu
+    de buffers partage par plusieurs .ib), sinon par le nom de fichier.
+    keys limite aux draw calls choisis (cles group_key, voir migoto_scan) ;
+    les .ini, communs a tout le dossier, sont toujours lus.
+    """
+    names = sorted(os.listdir(folder))
+    lays = {}
+    for n in names:
+        if not n.lower().endswith(('.ini', '.fmt', '.txt')): continue
+        if keys is not None and not n.lower().endswith('.ini') and group_key(n) not in keys:
+            continue
+        try:
+            lays[n] = parse_layout(os.path.join(folder, n))
+        except OSError as e:
+            log(f"[WARN] {n}: {e}")
+    ini_ibs, ini_vbs = _ini_pairs(lay for n, lay in lays.items() if n.lower().endswith('.ini'))
+    if keys is not None:
+        keys = set(keys)
+        names = [n for n in names if group_key(n) in keys or n.lower() in ini_vbs]
+    layouts = {}   # (cle, slot) -> layout (.fmt / .txt du meme mesh)
+    ib_fmts = {}   # cle -> format d'index declare
+    res_by_file = {}
+    for n, lay in lays.items():
+        low = n.lower()
+        lay['src'] = os.path.join(folder, n)
+        for res in lay['resources'].values():
+            res['src'] = lay['src']
+            if res.get('filename'):
+                res_by_file[os.path.basename(res['filename']).lower()] = res
+        key = group_key(n)
+        if lay['format'] in INDEX_FORMATS:
+            ib_fmts.setdefault(key, (lay['format'], lay['src']))
+        if (lay['elements'] or lay['stride']) and '-ib=' not in low:
+            layouts.setdefault((key, _slot(n)), lay)
+
+    is_ib = lambda n: _is_ib(n) or n.lower() in ini_ibs
+    meshes = {}
+    for n in names:
+        if is_ib(n):
+            res = res_by_file.get(n.lower(), {})
+            fmt, src = ib_fmts.get(group_key(n), (None, None))
+            if res.get('format'):
+                fmt, src = res['format'], res['src']
+            mesh = DrawBuffers(group_key(n), os.path.join(folder, n),
+                               fmt if fmt in INDEX_FORMATS else None)
+            mesh.add_source(src)
+            meshes[group_key(n)] = mesh
+    by_low = {k.lower(): k for k in meshes}
+    detect = None
+    for n in names:
+        if is_ib(n) or not (_is_vb(n) or n.lower() in ini_vbs): continue
+        slot, targets = ini_vbs.get(n.lower(), (_slot(n), [group_key(n).lower()]))
+        targets = [by_low[k] for k in targets if k in by_low]
+        if not targets:
+            if keys is None: log(f"[WARN] {n}: aucun .ib associe, SKIP")
+            continue
+        key  = targets[0]
+        res  = res_by_file.get(n.lower(), {})
+        lay  = layouts.get((group_key(n), slot)) or layouts.get((key, slot)) \
+               or layouts.get((key, 0), {})
+        elems = [e for e in lay.get('elements', []) if e['slot'] == slot] \
+                or default_elements(slot)
+        path = os.path.join(folder, n)
+        s = stride if slot == 0 else None
+        if not s:
+            # Import tardif : migoto_stride depend de ce module
+            import migoto_stride as detect
+            declared = res.get('stride') or lay.get('stride')
+            ib = meshes[key]
+            s = detect.detect_stride(path, [meshes[k].ib_path for k in targets], declared,
+                              ib.ib_format)
+            if s and declared and s != declared:
+                log(f"[WARN] {n}: stride {s} detecte, {declared} declare")
+            elif s and not declared:
+                log(f"[OK] {n}: stride {s} detecte")
+        if not s:
+            log(f"[WARN] {n}: stride introuvable, SKIP"); continue
+        for k in targets:
+            meshes[k].add_vb(slot, path, s, elems)
+            meshes[k].add_source(res.get('src'))
+            meshes[k].add_source(lay.get('src'))
+    if detect: detect.flush()
+    return [m for m in meshes.values() if m.vbs]
+
+
+# =============================================================================
+# CONVERSION INTEGREE
+# =============================================================================
+
+def mesh_arrays(mesh):
+    """(positions float32 (N,3), triangles uint32 (M,3)) d'un mesh decode."""
+    pos = mesh.positions
+    if pos is None:
+        raise ValueError("pas d'attribut POSITION")
+    pos = np.ascontiguousarray(pos[:, :3] if pos.ndim == 2 else pos, np.float32)
+    return pos, np.ascontiguousarray(mesh.indices, np.uint32)
+
+
+def _as_float(arr, ncomp):
+    """ncomp premieres composantes en float32 ; entiers *NORM ramenes a [-1, 1]/[0, 1]."""
+    if arr is None or arr.ndim != 2 or arr.shape[1] < ncomp:
+        return None
+    a = arr[:, :ncomp]
+    if a.dtype.kind in 'iu':
+        info = np.iinfo(a.dtype)
+        return np.maximum(a.astype(np.float32) / info.max, -1.0)
+    return np.ascontiguousarray(a, np.float32)
+
+
+def decode_mesh(mesh):
+    """Mesh pret a exporter : positions, indices, normales et UV si declares."""
+    pos, tris = mesh_arrays(mesh)
+    n = len(pos)
+    nrm, uv = _as_float(mesh.normals, 3), _as_float(mesh.uvs, 2)
+    return {'name': mesh.key, 'positions': pos, 'indices': tris,
+            'normals': nrm[:n] if nrm is not None and len(nrm) >= n else None,
+            'uvs':     uv[:n]  if uv  is not None and len(uv)  >= n else None}
+
+
+def content_key(mesh, hashes):
+    """
+    Empreinte de ce que decode_mesh produit : contenu de l'.ib et des .buf,
+    format d'index, strides et layouts. Independante des noms de fichiers :
+    les copies d'un meme mesh (variantes, toggles) ont la meme cle.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    desc = {'version': CONVERTER_VERSION, 'ib': hashes[os.path.basename(mesh.ib_path)]['hash'],
+            'ib_format': mesh.ib_format,
+            'vbs': [[slot, hashes[os.path.basename(p)]['hash'], stride, elems]
+                    for slot, (p, stride, elems) in sorted(mesh.vbs.items())]}
+    h.update(json.dumps(desc, sort_keys=True).encode('utf-8'))
+    return h.hexdigest()
+
+
+def decode_cached(mesh, key, cache):
+    """decode_mesh via le cache disque (key = content_key)."""
+    data = cache.get(key)
+    if data is None or not {'positions', 'indices'} <= data.keys():
+        data = decode_mesh(mesh)
+        try:
+            cache.put(key, {k: v for k, v in data.items() if k != 'name'})
+        except OSError:
+            pass
+        return data
+    return {'name': mesh.key, 'positions': data['positions'], 'indices': data['indices'],
+            'normals': data.get('normals'), 'uvs': data.get('uvs')}
+
+
+def convert_folder(folder, out_dir, stride=None, log=print, force=False, fmt='obj',
+                   keys=None):
+    """
+    Decode les meshes du dossier (ou les seuls draw calls keys) et les ecrit
+    au format fmt ('obj', 'gltf' ou 'all' ; les formats d'un mesh sont
+    ecrits en parallele depuis le meme decodage). Seuls les meshes dont les
+    entrees, options ou la version ont change depuis le manifeste du dossier
+    de sortie sont refaits (sauf force).
+    Retourne [(fichier_visionnable, positions, triangles)] ; seul le premier
+    mesh garde ses tableaux (pour l'apercu), None s'il etait deja a jour.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    if not migoto_export.FORMATS.get(fmt):
+        log(f"[WARN] Format '{fmt}' : moteur script uniquement, ecriture en OBJ")
+        fmt = 'obj'
+    manifest = migoto_manifest.Manifest(out_dir)
+    meshes = find_meshes(folder, stride, log, keys)
+    hashes = manifest.inputs(sorted({p for m in meshes for p in m.sources}))
+    cache  = mesh_cache()
+    seen   = {}   # cle de contenu -> (nom, export_mesh, sommets, triangles) du 1er mesh
+    done, fresh = [], 0
+    for mesh in meshes:
+        inputs  = {os.path.basename(p): hashes[os.path.basename(p)] for p in mesh.sources}
+        options = {'strides': {str(k): v[1] for k, v in sorted(mesh.vbs.items())},
+                   'format': fmt}
+        if not force and manifest.up_to_date(mesh.key, inputs, options, CONVERTER_VERSION):
+            fresh += 1
+            done.append((manifest.outputs(mesh.key)[0], None, None))
+            continue
+        try:
+            ckey = content_key(mesh, hashes)
+            if ckey in seen:
+                # Instance : fichiers recopies depuis ceux du premier, sans decodage
+                first, like, nv, nt = seen[ckey]
+                data  = None
+                stats = migoto_export.export_mesh({'name': mesh.key}, out_dir, fmt, like)
+            else:
+                data  = decode_cached(mesh, ckey, cache)
+                stats = migoto_export.export_mesh(data, out_dir, fmt)
+                first, nv, nt = None, len(data['positions']), len(data['indices'])
+                seen[ckey] = (mesh.key, stats, nv, nt)
+        except (ValueError, OSError) as e:
+            log(f"[ERR] {mesh.key}: {e}"); continue
+        outs = [st['path'] for st in stats]
+        manifest.record(mesh.key, inputs, options, CONVERTER_VERSION, outs, ckey)
+        log(f"[OK] {mesh.key}: {nv} verts, {nt} tris" + (f" (instance de {first})" if first else ''))
+        for st in stats:
+            log(f"      {os.path.basename(st['path'])} : {migoto_export.rate(st)}")
+        # Tableaux du premier mesh seulement : pas tout le dossier en memoire
+        done.append((outs[0], None, None) if data is None or done else
+                    (outs[0], data['positions'], data['indices']))
+    manifest.save()
+    log(f"[OK] {len(done) - fresh} reconstruit(s), {fresh} a jour")
+    return done
@@ -0,0 +1,205 @@
+"""
+Export des meshes decodes : OBJ (texte) et glTF binaire (.glb).
+Le mesh est decode une fois ; tous les formats demandes sont ecrits en
+parallele depuis les memes tableaux. Chaque writer rapporte octets et duree.
+Un mesh identique a un mesh deja ecrit (instance) est copie depuis ce
+fichier, seul son nom change.
+"""
+
+import os, json, shutil, struct, time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+ROWS = 1 << 16   # lignes OBJ formatees par appel
+
+# Formats de l'option --format -> writers integres (FBX : script uniquement)
+FORMATS = {'obj': ('obj',), 'gltf': ('glb',), 'all': ('obj', 'glb'), 'fbx': ()}
+
+
+# =============================================================================
+# OBJ
+# =============================================================================
+
+def _lines(f, fmt, arr):
+    """Ecrit arr ligne par ligne avec fmt, par gros blocs formates d'un coup."""
+    for i in range(0, len(arr), ROWS):
+        part = arr[i:i+ROWS]
+        f.write((fmt*len(part)) % tuple(part.ravel().tolist()))
+
+
+def write_obj(path, mesh):
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        f.write(f"o {mesh['name']}\n")
+        _lines(f, 'v %.6f %.6f %.6f\n', mesh['positions'])
+        if mesh.get('uvs') is not None:
+            uv = mesh['uvs'].copy()
+            uv[:, 1] = 1.0 - uv[:, 1]          # origine DirectX en haut
+            _lines(f, 'vt %.6f %.6f\n', uv)
+        if mesh.get('normals') is not None:
+            _lines(f, 'vn %.6f %.6f %.6f\n', mesh['normals'])
+        t = mesh['indices'].astype(np.int64) + 1
+        if mesh.get('uvs') is not None and mesh.get('normals') is not None:
+            _lines(f, 'f %d/%d/%d %d/%d/%d %d/%d/%d\n', np.repeat(t, 3, axis=1))
+        elif mesh.get('uvs') is not None:
+            _lines(f, 'f %d/%d %d/%d %d/%d\n', np.repeat(t, 2, axis=1))
+        elif mesh.get('normals') is not None:
+            _lines(f, 'f %d//%d %d//%d %d//%d\n', np.repeat(t, 2, axis=1))
+        else:
+            _lines(f, 'f %d %d %d\n', t)
+
+
+# =============================================================================
+# GLB
+# =============================================================================
+
+def _pad(data, fill=b'\0'):
+    return data + fill*(-len(data) % 4)
+
+
+def write_glb(path, mesh):
+    """glTF 2.0 binaire : les tableaux sont copies tels quels dans le BIN."""
+    blobs, views, accessors = [], [], []
+    offset = 0
+
+    def add(arr, ctype, kind, target, minmax=False):
+        nonlocal offset
+        data = _pad(np.ascontiguousarray(arr).tobytes())
+        views.append({'buffer': 0, 'byteOffset': offset,
+                      'byteLength': arr.nbytes, 'target': target})
+        acc = {'bufferView': len(views)-1, 'componentType': ctype,
+               'count': len(arr), 'type': kind}
+        if minmax:
+            acc['min'] = arr.min(axis=0).tolist()
+            acc['max'] = arr.max(axis=0).tolist()
+        accessors.append(acc)
+        blobs.append(data)
+        offset += len(data)
+        return len(accessors)-1
+
+    pos   = np.asarray(mesh['positions'], np.float32)
+    attrs = {'POSITION': add(pos, 5126, 'VEC3', 34962, minmax=len(pos) > 0)}
+    if mesh.get('normals') is not None:
+        n = np.asarray(mesh['normals'], np.float32)
+        n = n / np.maximum(np.linalg.norm(n, axis=1, keepdims=True), 1e-12)
+        attrs['NORMAL'] = add(n.astype(np.float32), 5126, 'VEC3', 34962)
+    if mesh.get('uvs') is not None:
+        attrs['TEXCOORD_0'] = add(np.asarray(mesh['uvs'], np.float32), 5126, 'VEC2', 34962)
+    idx = mesh['indices'].ravel()
+    idx = idx.astype(np.uint16) if len(pos) < 0xFFFF else idx.astype(np.uint32)
+    ind = add(idx, 5123 if idx.dtype == np.uint16 else 5125, 'SCALAR', 34963)
+
+    gltf = {'asset': {'version': '2.0', 'generator': 'migoto_gui'},
+            'scene': 0, 'scenes': [{'nodes': [0]}],
+            'nodes': [{'mesh': 0, 'name': mesh['name']}],
+            'meshes': [{'name': mesh['name'],
+                        'primitives': [{'attributes': attrs, 'indices': ind}]}],
+            'buffers': [{'byteLength': offset}],
+            'bufferViews': views, 'accessors': accessors}
+    js  = _pad(json.dumps(gltf, separators=(',', ':')).encode('utf-8'), b' ')
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<4sII', b'glTF', 2, 12 + 8 + len(js) + 8 + offset))
+        f.write(struct.pack('<I4s', len(js), b'JSON') + js)
+        f.write(struct.pack('<I4s', offset, b'BIN\0'))
+        for b in blobs:
+            f.write(b)
+
+
+def read_glb(path):
+    """Relit un .glb (positions + indices de chaque primitive) -> (verts, tris, groups)."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    jlen = struct.unpack_from('<I', data, 12)[0]
+    gltf = json.loads(data[20:20+jlen])
+    bin_ = memoryview(data)[20+jlen+8:]
+    dtypes = {5126: np.float32, 5125: np.uint32, 5123: np.uint16}
+
+    def get(i):
+        acc  = gltf['accessors'][i]
+        view = gltf['bufferViews'][acc['bufferView']]
+        n    = acc['count']*{'SCALAR': 1, 'VEC2': 2, 'VEC3': 3}[acc['type']]
+        return np.frombuffer(bin_, dtypes[acc['componentType']], n,
+                             view.get('byteOffset', 0) + acc.get('byteOffset', 0))
+
+    verts, tris, groups, base = [], [], [0], 0
+    for m in gltf['meshes']:
+        for p in m['primitives']:
+            v = get(p['attributes']['POSITION']).reshape(-1, 3)
+            t = get(p['indices']).astype(np.uint32).reshape(-1, 3) + base
+            verts.append(v); tris.append(t)
+            base += len(v); groups.append(groups[-1] + len(t))
+    if not verts:
+        return np.zeros((0, 3), np.float32), np.zeros((0, 3), np.uint32), np.zeros(1, np.uint32)
+    return (np.concatenate(verts).astype(np.float32), np.concatenate(tris),
+            np.array(groups, np.uint32))
+
+
+# =============================================================================
+# INSTANCES
+# =============================================================================
+
+def copy_obj(path, src, name):
+    """Copie d'un OBJ ecrit par write_obj, avec la ligne 'o' renommee."""
+    with open(src, 'rb') as fi, open(path, 'wb') as fo:
+        fi.readline()
+        fo.write(f"o {name}\n".encode('utf-8'))
+        shutil.copyfileobj(fi, fo, 1 << 20)
+
+
+def copy_glb(path, src, name):
+    """Copie d'un .glb ecrit par write_glb : JSON renomme, BIN recopie tel quel."""
+    with open(src, 'rb') as fi:
+        _, _, total = struct.unpack('<4sII', fi.read(12))
+        jlen = struct.unpack('<I4s', fi.read(8))[0]
+        gltf = json.loads(fi.read(jlen))
+        gltf['nodes'][0]['name'] = gltf['meshes'][0]['name'] = name
+        js = _pad(json.dumps(gltf, separators=(',', ':')).encode('utf-8'), b' ')
+        with open(path, 'wb') as fo:
+            fo.write(struct.pack('<4sII', b'glTF', 2, total - jlen + len(js)))
+            fo.write(struct.pack('<I4s', len(js), b'JSON') + js)
+            shutil.copyfileobj(fi, fo, 1 << 20)
+
+
+# =============================================================================
+# EXPORT
+# =============================================================================
+
+WRITERS = {'obj': write_obj, 'glb': write_glb}
+COPIERS = {'obj': copy_obj,  'glb': copy_glb}
+
+
+def _timed(writer, path, *args):
+    t0 = time.perf_counter()
+    writer(path, *args)
+    return path, os.path.getsize(path), time.perf_counter() - t0
+
+
+def export_mesh(mesh, out_dir, fmt='obj', like=None):
+    """
+    Ecrit le mesh dans tous les formats demandes, en parallele.
+    mesh = {'name', 'positions', 'indices', 'normals'?, 'uvs'?}.
+    like : resultat d'export_mesh d'un mesh identique, recopie au lieu de reecrire.
+    Retourne [{'format', 'path', 'bytes', 'time'}] (ordre de FORMATS).
+    """
+    exts = FORMATS.get(fmt, ('obj',))
+    src  = {st['format']: st['path'] for st in like or ()}
+
+    def job(ext):
+        path = os.path.join(out_dir, f"{mesh['name']}.{ext}")
+        if ext in src and os.path.abspath(src[ext]) != os.path.abspath(path):
+            return _timed(COPIERS[ext], path, src[ext], mesh['name'])
+        return _timed(WRITERS[ext], path, mesh)
+
+    with ThreadPoolExecutor(max_workers=max(1, len(exts))) as pool:
+        futs = [(ext, pool.submit(job, ext)) for ext in exts]
+        out = []
+        for ext, fut in futs:
+            path, size, dt = fut.result()
+            out.append({'format': ext, 'path': path, 'bytes': size, 'time': dt})
+    return out
+
+
+def rate(stat):
+    """'1.2 Mo en 0.03 s (40.0 Mo/s)' pour le journal."""
+    mb = stat['bytes']/1e6
+    return f"{mb:.1f} Mo en {stat['time']:.2f} s ({mb/max(stat['time'], 1e-6):.1f} Mo/s)"
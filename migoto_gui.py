@@ -3,9 +3,29 @@
 Visionneuse 3D integree + export OBJ/glTF/FBX
 """
 
+import os, sys, threading, time, queue
+
+if __name__ == '__main__' and '--batch' in sys.argv[1:]:
+    # Mode lot sans interface : tkinter n'est jamais importe
+    import migoto_batch
+    sys.exit(migoto_batch.main(sys.argv[1:]))
+
 import tkinter as tk
 from tkinter import ttk, filedialog, scrolledtext
-import os, sys, threading, subprocess, struct, math, json
+
+import numpy as np
+
+import migoto_batch
+import migoto_cache
+import migoto_decode
+import migoto_export
+import migoto_manifest
+import migoto_mesh
+import migoto_obj
+import migoto_profile
+import migoto_render as render
+import migoto_scan
+import migoto_worker
 
 # ── Couleurs ──────────────────────────────────────────────────────────────────
 BG      = "#0d0d1a"
@@ -22,6 +42,27 @@ BORDER  = "#2a2a50"
 MESH_C  = "#7c5cfc"
 GRID_C  = "#1e1e3a"
 
+# ── Console ───────────────────────────────────────────────────────────────────
+LOG_LINES = 2000              # lignes gardees dans le widget
+LOG_TICK  = 50                # ms entre deux vidages de la file
+LOG_FILE  = 'console.log'     # journal complet (dossier de cache)
+LOG_MAX   = 5 << 20           # au-dela, l'ancien journal passe en .1
+
+PREFETCH  = 3                 # entrees du selecteur preparees d'avance
+PREVIEW_TRIS = 50000          # triangles du premier apercu d'un gros mesh
+VIEW_EXTS = ('.obj', '.glb')  # sorties lisibles par la visionneuse
+
+
+def log_tag(line):
+    """Tag console d'une ligne de sortie du convertisseur."""
+    return 'err'  if '[ERR]'  in line or 'Error' in line else \
+           'ok'   if '[OK]'   in line or 'Termine' in line else \
+           'warn' if '[WARN]' in line or 'SKIP'   in line else ''
+
+
+class LoadCancelled(Exception):
+    """Chargement abandonne : un autre mesh a ete choisi entre-temps."""
+
 
 # =============================================================================
 # MINI VISIONNEUSE 3D (Canvas tkinter - projection perspective)
@@ -30,7 +71,10 @@ GRID_C  = "#1e1e3a"
 class Viewer3D(tk.Canvas):
     def __init__(self, parent, **kw):
         super().__init__(parent, bg=BG, highlightthickness=0, **kw)
-        self.meshes     = []   # liste de {'verts':[(x,y,z)], 'tris':[(a,b,c)], 'color':str}
+        self.store      = migoto_mesh.MeshStore(np.zeros((0,3), np.float32))  # pool + groupes
+        self._scene     = None # tableaux NumPy prets a projeter (voir migoto_render)
+        self.backend    = 'raster'  # 'raster' (image z-buffer) ou 'poly' (polygones Tk)
+        self._photo     = None
         self.rot_x      = 20.0
         self.rot_y      = 0.0
         self.zoom       = 1.0
@@ -38,139 +82,258 @@ class Viewer3D(tk.Canvas):
         self.pan_y      = 0.0
         self._drag      = None
         self._last      = None
+        self.cache      = migoto_cache.LRUCache()  # meshes prepares, par fichier ou contenu
+        self.content    = {}   # fichier -> cle de contenu (manifeste) : copies partagees
+        # Interaction : proxies decimes + redessins groupes
+        self._lods        = []    # proxies (du plus fin au plus grossier)
+        self.frame_budget = 1/30  # s par image pendant rotation/pan/zoom
+        self._interactive = False
+        self._cost        = {}    # niveau -> duree du dernier rendu a ce niveau
+        self._pending     = None  # after() du prochain rendu groupe
+        self._settle      = None  # after() du rendu complet apres la molette
+        # Scene retenue : items Tk crees une fois puis mis a jour a chaque image
+        self._size   = None  # (w,h) de la grille actuelle
+        self._pool   = []    # polygones reutilises, dans l'ordre d'empilement
+        self._shown  = 0     # polygones visibles a l'image precedente
+        self._frame  = self.create_image(0, 0, anchor='nw', state='hidden')
+        self._hud    = self.create_text(8, 8, anchor='nw', fill=TEXT2,
+                                        font=("Consolas",8), tags='hud')
+        self._help   = self.create_text(8, 0, anchor='nw', fill=TEXT2, font=("Consolas",8),
+                                        text="Clic gauche: rotation  |  Clic droit: pan  |  Molette: zoom",
+                                        tags='hud')
+        self._stats  = self.create_text(0, 8, anchor='ne', fill=YELLOW, font=("Consolas",8),
+                                        justify='left', state='hidden', tags='hud')
+        self.prof    = migoto_profile.Profiler()   # incrustation + trace de session
+        self._empty  = self.create_text(0, 0, text="Aucun mesh charge\nConvertis d'abord un mod",
+                                        fill=TEXT2, font=("Segoe UI",12), justify='center',
+                                        tags='hud')
         self.bind('<ButtonPress-1>',   self._on_press)
         self.bind('<B1-Motion>',       self._on_drag)
+        self.bind('<ButtonRelease-1>', self._on_release)
         self.bind('<ButtonPress-3>',   self._on_rpress)
         self.bind('<B3-Motion>',       self._on_rdrag)
+        self.bind('<ButtonRelease-3>', self._on_release)
         self.bind('<MouseWheel>',      self._on_wheel)
         self.bind('<Configure>',       lambda e: self._draw())
         self._colors = [ACCENT, ACCENT2, GREEN, YELLOW,
                         "#ff8c42","#44cfcb","#f038ff","#00b4d8"]
 
-    def load_obj(self, path):
-        """Charge un fichier OBJ dans la visionneuse."""
-        self.meshes = []
-        verts, tris = [], []
-        try:
-            with open(path, encoding='utf-8', errors='ignore') as f:
-                for line in f:
-                    line = line.strip()
-                    if line.startswith('o ') or line.startswith('g '):
-                        if tris:
-                            self.meshes.append({'verts': verts, 'tris': tris,
-                                                'color': self._colors[len(self.meshes)%len(self._colors)]})
-                            verts, tris = list(verts), []
-                    elif line.startswith('v '):
-                        p = line.split()
-                        verts.append((float(p[1]), float(p[2]), float(p[3])))
-                    elif line.startswith('f '):
-                        p = line.split()[1:]
-                        def idx(s): return int(s.split('/')[0]) - 1
-                        if len(p) >= 3:
-                            tris.append((idx(p[0]), idx(p[1]), idx(p[2])))
-            if tris:
-                self.meshes.append({'verts': verts, 'tris': tris,
-                                    'color': self._colors[len(self.meshes)%len(self._colors)]})
-        except Exception as e:
-            print(f"Viewer: {e}")
-
-        # Normalise
-        all_v = [v for m in self.meshes for v in m['verts']]
-        if all_v:
-            cx = sum(v[0] for v in all_v)/len(all_v)
-            cy = sum(v[1] for v in all_v)/len(all_v)
-            cz = sum(v[2] for v in all_v)/len(all_v)
-            maxd = max(abs(v[i]-[cx,cy,cz][i]) for v in all_v for i in range(3)) or 1
-            scale = 1.0/maxd
-            for m in self.meshes:
-                m['verts'] = [((v[0]-cx)*scale, (v[1]-cy)*scale, (v[2]-cz)*scale)
-                              for v in m['verts']]
-        self.rot_x, self.rot_y = 20.0, 0.0
-        self.zoom = 1.0
-        self.pan_x = self.pan_y = 0.0
+    def cache_key(self, path):
+        """Cle de cache : le contenu si connu (copies identiques = une entree), sinon le fichier."""
+        content = self.content.get(path)
+        return ('contenu', content) if content else migoto_cache.file_key(path)
+
+    def prepare_file(self, path, arrays=None, progress=None, cancel=None, preview=None):
+        """
+        Mesh prepare d'un fichier, depuis le cache ou lu puis mis en cache.
+        arrays : (verts, tris, groups) deja decodes de ce fichier (pas de relecture).
+        Voir prepare() pour progress, cancel et preview.
+        """
+        key  = self.cache_key(path)
+        prep = self.cache.get(key)
+        if prep is None:
+            if arrays is None and path in self.content:
+                # Mesh decode lors de la conversion : pas de relecture du fichier
+                data = migoto_decode.mesh_cache().get(self.content[path])
+                if data is not None and 'positions' in data:
+                    arrays = (data['positions'].copy(), data['indices'],
+                              np.array([0, len(data['indices'])], np.uint32))
+            nxt = 1     # triangles lus a partir desquels afficher le prochain apercu
+            def parsed(frac, partial):
+                # Entre deux blocs du parsing : abandon, avancement, apercu du debut lu
+                nonlocal nxt
+                if cancel and cancel():
+                    raise LoadCancelled()
+                if progress: progress(frac, "lecture")
+                if preview and frac < 1:
+                    verts, tris = partial()
+                    if len(tris) >= nxt:
+                        store = migoto_mesh.MeshStore(verts, tris, [0, len(tris)], self._colors)
+                        store.normalize()
+                        preview(self._prepare_part(store))
+                        nxt = PREVIEW_TRIS
+                        while nxt <= len(tris): nxt *= 8
+            if arrays is None:
+                if progress: progress(0.0, "lecture")
+                if path.lower().endswith('.glb'):
+                    arrays = migoto_export.read_glb(path)
+                else:
+                    arrays = migoto_obj.load_obj(path, step=parsed)
+            prep = self.prepare(*arrays, progress=progress, cancel=cancel, preview=preview,
+                                first=max(nxt, PREVIEW_TRIS))
+            self.cache.put(key, prep, prep['nbytes'])
+        return prep
+
+    def prepare(self, verts, tris, groups, progress=None, cancel=None, preview=None,
+                first=PREVIEW_TRIS):
+        """
+        Normalise et construit scene + proxies. Sans Tk : appelable hors du thread UI.
+        progress(fraction, etape) suit l'avancement ; si cancel() devient vrai,
+        LoadCancelled est levee entre deux etapes ; preview(prep) recoit des
+        apercus sur des prefixes croissants des triangles (a partir de first)
+        avant le resultat.
+        """
+        def step(frac, what):
+            if cancel and cancel():
+                raise LoadCancelled()
+            if progress: progress(frac, what)
+
+        # Un seul pool de sommets partage par tous les groupes (indices OBJ globaux)
+        store = migoto_mesh.MeshStore(verts, tris, groups, self._colors)
+        # Normalise (en place, une fois pour tout le pool)
+        store.normalize(lambda f: step(0.1 + 0.3*f, "normalisation"))
+        k = first
+        while preview and k < store.tri_count:
+            step(0.4, "apercu")
+            preview(self._prepare_part(store.head(k)))
+            k *= 8
+        step(0.5, "ombrage")
+        prep = self._prepare_part(store)
+        step(0.7, "proxies")
+        prep['lods'] = render.build_lods(prep['scene']) if prep['scene'] is not None else []
+        prep['nbytes'] = migoto_cache.nbytes(prep)
+        step(1.0, "pret")
+        return prep
+
+    def _prepare_part(self, store):
+        """Scene d'un store (sans proxies)."""
+        # Ombrage/couleurs calcules une fois ici, pas a chaque image
+        return {'store': store, 'scene': render.build_scene(store), 'lods': []}
+
+    def show(self, prep, reset=True):
+        """Affiche un mesh prepare (instantane s'il sort du cache)."""
+        self.store  = prep['store']
+        self._scene = prep['scene']
+        self._lods  = prep['lods']
+        self._cost  = {}
+        # Libere le pool de l'ancien mesh (il peut etre bien plus gros)
+        self.delete('tri')
+        self._pool, self._shown = [], 0
+        if reset:
+            self.rot_x, self.rot_y = 20.0, 0.0
+            self.zoom = 1.0
+            self.pan_x = self.pan_y = 0.0
         self._draw()
 
-    def _project(self, x, y, z, w, h, fov=600):
-        # Rotation X
-        rx = math.radians(self.rot_x)
-        y2 = y*math.cos(rx) - z*math.sin(rx)
-        z2 = y*math.sin(rx) + z*math.cos(rx)
-        # Rotation Y
-        ry = math.radians(self.rot_y)
-        x2 = x*math.cos(ry) + z2*math.sin(ry)
-        z3 = -x*math.sin(ry) + z2*math.cos(ry)
-        # Projection perspective
-        d  = fov * self.zoom
-        pz = z3 + 3.0
-        if pz < 0.01: pz = 0.01
-        px = x2*d/pz + w/2 + self.pan_x
-        py = -y2*d/pz + h/2 + self.pan_y
-        return px, py, pz
+    def _pick_level(self):
+        """Niveau le plus fin qui tenait dans le budget au dernier rendu."""
+        if not self._interactive:
+            return 0
+        for lvl in range(len(self._lods)+1):
+            if self._cost.get(lvl, 0) <= self.frame_budget:
+                return lvl
+        return len(self._lods)
+
+    def _layout(self, w, h):
+        """Grille et HUD : recrees/replaces seulement quand la taille change."""
+        if self._size == (w, h):
+            return
+        self._size = (w, h)
+        self.delete('grid')
+        for i in range(0, w, 40):
+            self.create_line(i, 0, i, h, fill=GRID_C, tags='grid')
+        for i in range(0, h, 40):
+            self.create_line(0, i, w, i, fill=GRID_C, tags='grid')
+        self.tag_lower('grid')
+        self.tag_lower(self._frame)
+        self.coords(self._help, 8, h-16)
+        self.coords(self._stats, w-8, 8)
+        self.coords(self._empty, w//2, h//2)
+
+    def _fill_pool(self, coords, fills):
+        """Met a jour les polygones du pool ; le surplus est cache."""
+        n = len(coords)
+        if n > len(self._pool):
+            self._pool += [self.create_polygon(0,0,0,0,0,0, outline='', width=0, tags='tri')
+                           for _ in range(n - len(self._pool))]
+            self.tag_raise('hud')
+        # Le i-eme item du pool recoit le i-eme triangle le plus lointain :
+        # l'ordre d'empilement suit l'ordre de creation, sans tag_raise par item
+        for iid, c, col in zip(self._pool, coords.tolist(), fills.tolist()):
+            self.coords(iid, *c)
+            self.itemconfigure(iid, fill=col)
+        for iid in self._pool[self._shown:n]:
+            self.itemconfigure(iid, state='normal')
+        for iid in self._pool[n:self._shown]:
+            self.itemconfigure(iid, state='hidden')
+        self._shown = n
 
     def _draw(self):
-        self.delete('all')
+        t0 = time.perf_counter()
+        prof = self.prof
+        prof.begin_frame()
         w = self.winfo_width()  or 400
         h = self.winfo_height() or 400
+        self._layout(w, h)
+        lvl   = self._pick_level()
+        scene = self._scene if lvl == 0 else self._lods[lvl-1]
+
+        # Rendu z-buffer : une seule image, cout Tk constant
+        raster = self.backend == 'raster' and scene is not None
+        if raster:
+            img = render.render_raster(scene, self.rot_x, self.rot_y,
+                                       self.zoom, self.pan_x, self.pan_y, w, h, BG, GRID_C,
+                                       scale=2 if self._interactive else 1, prof=prof)
+            with prof.stage('image'):
+                self._photo = tk.PhotoImage(data=render.to_ppm(img), format='PPM')
+                self.itemconfigure(self._frame, image=self._photo, state='normal')
+        else:
+            self.itemconfigure(self._frame, state='hidden')
+        self.itemconfigure('grid', state='hidden' if raster else 'normal')
+
+        # Repli polygones : transformation, culling et tri vectorises (painter's)
+        if self.backend == 'poly' and scene is not None:
+            coords, fills = render.render_frame(scene, self.rot_x, self.rot_y,
+                                                self.zoom, self.pan_x, self.pan_y, w, h, prof)
+        else:
+            coords, fills = np.zeros((0,6)), np.zeros(0, str)
+        with prof.stage('tk'):
+            self._fill_pool(coords, fills)
 
-        # Grille de fond
-        for i in range(0, w, 40):
-            self.create_line(i, 0, i, h, fill=GRID_C)
-        for i in range(0, h, 40):
-            self.create_line(0, i, w, i, fill=GRID_C)
+        # Info
+        store = self.store
+        self.itemconfigure(self._empty, state='hidden' if len(store) else 'normal')
+        for iid in (self._hud, self._help):
+            self.itemconfigure(iid, state='normal' if len(store) else 'hidden')
+        if len(store):
+            info = f"{len(store)} mesh  |  {store.vertex_count} verts  |  {store.tri_count} tris"
+            if lvl:
+                info += f"  |  apercu {len(scene['tris'])} tris"
+            self.itemconfigure(self._hud, text=info)
+        # Le rendu complet sert aussi d'estimation pour le premier geste
+        self._cost[lvl] = time.perf_counter() - t0
+        prof.end_frame()
+        if prof.enabled:
+            self.itemconfigure(self._stats, text=prof.overlay(), state='normal')
+
+    # ── Redessins groupes ────────────────────────────────────────────────────
+
+    def request_draw(self):
+        """Redessin interactif, au plus un par intervalle de frame_budget."""
+        self._interactive = True
+        if self._pending is None:
+            self._pending = self.after(max(1, int(self.frame_budget*1000)), self._flush)
+
+    def _flush(self):
+        self._pending = None
+        self._draw()
 
-        if not self.meshes:
-            self.create_text(w//2, h//2, text="Aucun mesh charge\nConvertis d'abord un mod",
-                             fill=TEXT2, font=("Segoe UI",12), justify='center')
-            return
+    def end_interaction(self):
+        """Fin de geste : rendu complet du mesh entier."""
+        for job in (self._pending, self._settle):
+            if job is not None: self.after_cancel(job)
+        self._pending = self._settle = None
+        self._interactive = False
+        self._draw()
 
-        # Collecte tous les triangles avec profondeur
-        all_tris = []
-        for mesh in self.meshes:
-            verts = mesh['verts']
-            color = mesh['color']
-            for a, b, c in mesh['tris']:
-                if a>=len(verts) or b>=len(verts) or c>=len(verts): continue
-                va, vb, vc = verts[a], verts[b], verts[c]
-                pax,pay,paz = self._project(va[0],va[1],va[2],w,h)
-                pbx,pby,pbz = self._project(vb[0],vb[1],vb[2],w,h)
-                pcx,pcy,pcz = self._project(vc[0],vc[1],vc[2],w,h)
-                depth = (paz+pbz+pcz)/3
-                # Normale pour backface culling + shading
-                ex,ey = pbx-pax, pby-pay
-                fx,fy = pcx-pax, pcy-pay
-                cross = ex*fy - ey*fx
-                if cross > 0: continue  # backface
-                # Shading simple
-                n3d = ((vb[0]-va[0])*(vc[1]-va[1])-(vb[1]-va[1])*(vc[0]-va[0]),
-                       (vb[1]-va[1])*(vc[2]-va[2])-(vb[2]-va[2])*(vc[1]-va[1]),
-                       (vb[2]-va[2])*(vc[0]-va[0])-(vb[0]-va[0])*(vc[2]-va[2]))
-                nlen = math.sqrt(sum(x*x for x in n3d)) or 1
-                n3d  = tuple(x/nlen for x in n3d)
-                light = (0.5, 0.8, 0.3)
-                diff  = max(0, sum(n3d[i]*light[i] for i in range(3)))
-                shade = 0.2 + 0.8*diff
-                # Applique shade sur la couleur hex
-                r = int(int(color[1:3],16)*shade)
-                g = int(int(color[3:5],16)*shade)
-                b_ = int(int(color[5:7],16)*shade)
-                c_str = f'#{min(r,255):02x}{min(g,255):02x}{min(b_,255):02x}'
-                all_tris.append((depth, pax,pay,pbx,pby,pcx,pcy,c_str))
-
-        # Trie par profondeur (painter's algorithm)
-        all_tris.sort(key=lambda x: -x[0])
-        for t in all_tris:
-            _,ax,ay,bx,by,cx,cy,col = t
-            self.create_polygon(ax,ay,bx,by,cx,cy, fill=col, outline='', width=0)
+    def set_backend(self, backend):
+        self.backend = backend
+        self._draw()
 
-        # Info
-        n_tris = sum(len(m['tris']) for m in self.meshes)
-        n_v    = sum(len(m['verts']) for m in self.meshes)
-        self.create_text(8, 8, anchor='nw',
-                         text=f"{len(self.meshes)} mesh  |  {n_v} verts  |  {n_tris} tris",
-                         fill=TEXT2, font=("Consolas",8))
-        self.create_text(8, h-16, anchor='nw',
-                         text="Clic gauche: rotation  |  Clic droit: pan  |  Molette: zoom",
-                         fill=TEXT2, font=("Consolas",8))
+    def set_profiling(self, on):
+        self.prof.enabled = on
+        self.itemconfigure(self._stats, state='normal' if on else 'hidden')
+        self._draw()
 
     def _on_press(self,  e): self._drag='rot';  self._last=(e.x,e.y)
     def _on_rpress(self, e): self._drag='pan';  self._last=(e.x,e.y)
@@ -178,16 +341,22 @@ class Viewer3D(tk.Canvas):
         if self._last:
             dx,dy = e.x-self._last[0], e.y-self._last[1]
             self.rot_y += dx*0.5; self.rot_x += dy*0.5
-            self._last=(e.x,e.y); self._draw()
+            self._last=(e.x,e.y); self.request_draw()
     def _on_rdrag(self, e):
         if self._last:
             dx,dy = e.x-self._last[0], e.y-self._last[1]
             self.pan_x += dx; self.pan_y += dy
-            self._last=(e.x,e.y); self._draw()
+            self._last=(e.x,e.y); self.request_draw()
     def _on_wheel(self, e):
         factor = 1.1 if e.delta > 0 else 0.9
         self.zoom = max(0.05, min(20.0, self.zoom*factor))
-        self._draw()
+        self.request_draw()
+        # Pas d'evenement de fin pour la molette : rendu complet apres une pause
+        if self._settle is not None: self.after_cancel(self._settle)
+        self._settle = self.after(250, self.end_interaction)
+    def _on_release(self, e):
+        self._drag = None
+        if self._interactive: self.end_interaction()
 
 
 # =============================================================================
@@ -208,11 +377,34 @@ class App(tk.Tk):
         self.stride_var  = tk.StringVar(value="auto")
         self.format_var  = tk.StringVar(value="all")
         self.script_var  = tk.StringVar()
+        self.engine_var  = tk.StringVar(value="builtin")
+        self.incr_var    = tk.BooleanVar(value=True)
+        self.backend_var = tk.StringVar(value="raster")
         self.running     = False
         self._last_objs  = []  # fichiers OBJ generes
-        self._stride_cache = {}  # dossier -> stride
+        self._obj_by_name = {}  # nom affiche dans le selecteur -> chemin
+        self._prefetch_gen = 0  # change a chaque selection : arrete le prechargement en cours
+        self._prefetch_todo = []   # fichiers a precharger (un seul thread, voir _prefetch)
+        self._prefetch_busy = False
+        self._prefetch_lock = threading.Lock()
+        self._load_gen     = 0  # idem pour le chargement en cours dans la visionneuse
+        self._preview_gen  = 0  # chargement dont un apercu est deja affiche
+        self._batch      = []  # dossiers en file pour la conversion par lot
+        self._stride_cache = {}  # (dossier, mtime) -> strides (detection, voir migoto_stride)
+        self._scan       = None  # index du dossier de buffers (migoto_scan)
+        self._draw_keys  = []    # cle du draw call de chaque ligne de la liste
+        self._logq       = queue.SimpleQueue()  # (ligne, tag) de n'importe quel thread
+        self._logfile    = self._open_logfile()
+        # Script externe charge une fois dans un processus persistant
+        self._worker     = migoto_worker.ScriptWorker(lambda line: self._log(line, log_tag(line)))
 
         self._build_ui()
+        self.protocol('WM_DELETE_WINDOW', self._on_close)
+        self._pump_log()
+
+    def _on_close(self):
+        self._worker.close()
+        self.destroy()
 
     # ── Construction UI ──────────────────────────────────────────────────────
 
@@ -254,6 +446,8 @@ class App(tk.Tk):
         vbtns.pack(side='right', padx=8)
         self._vbtn(vbtns, "Recharger", self._reload_viewer)
         self._vbtn(vbtns, "Reset vue", self._reset_view)
+        self._vbtn(vbtns, "Profil", lambda: self.viewer.set_profiling(not self.viewer.prof.enabled))
+        self.btn_trace = self._vbtn(vbtns, "Trace", self._toggle_trace)
 
         # Selector mesh
         sel_frame = tk.Frame(right, bg=BG2, pady=4)
@@ -264,6 +458,15 @@ class App(tk.Tk):
         self.mesh_selector.pack(side='left')
         self.mesh_selector.bind('<<ComboboxSelected>>', self._on_mesh_select)
 
+        for v,l in [("poly","Polygones"),("raster","Image")]:
+            tk.Radiobutton(sel_frame, text=l, variable=self.backend_var, value=v,
+                           command=lambda: self.viewer.set_backend(self.backend_var.get()),
+                           bg=BG2, fg=TEXT, selectcolor=BG3,
+                           activebackground=BG2, activeforeground=ACCENT,
+                           font=("Segoe UI",9)).pack(side='right', padx=2)
+        tk.Label(sel_frame, text="Rendu:", fg=TEXT2, bg=BG2,
+                 font=("Segoe UI",9)).pack(side='right', padx=(10,4))
+
         # Canvas 3D
         self.viewer = Viewer3D(right)
         self.viewer.pack(fill='both', expand=True, padx=2, pady=2)
@@ -282,6 +485,20 @@ class App(tk.Tk):
         self._path_row(parent, self.buffers_var, self._browse_buffers,
                        "(dossier contenant les .ib et .buf)")
 
+        section("Draw calls (aucun choisi = tous)")
+        dc = tk.Frame(parent, bg=PANEL)
+        dc.pack(fill='x', padx=10, pady=(2,0))
+        self.draw_list = tk.Listbox(dc, height=5, bg=BG2, fg=TEXT, relief='flat',
+                                    selectmode='extended', exportselection=False,
+                                    font=("Consolas",8), highlightthickness=1,
+                                    highlightbackground=BORDER, selectbackground=ACCENT)
+        self.draw_list.pack(fill='x')
+        dbtns = tk.Frame(dc, bg=PANEL)
+        dbtns.pack(fill='x', pady=(2,0))
+        self._vbtn(dbtns, "Tout", lambda: self.draw_list.selection_set(0, 'end'))
+        self._vbtn(dbtns, "Aucun", lambda: self.draw_list.selection_clear(0, 'end'))
+        self._vbtn(dbtns, "Reindexer", self._rescan)
+
         section("Dossier de sortie")
         self._path_row(parent, self.output_var, self._browse_output,
                        "(meme dossier par defaut)")
@@ -308,6 +525,18 @@ class App(tk.Tk):
                            activebackground=PANEL, activeforeground=ACCENT,
                            font=("Segoe UI",9)).grid(row=0,column=3+i,sticky='w',padx=2)
 
+        tk.Label(opt, text="Moteur:", fg=TEXT2, bg=PANEL,
+                 font=("Segoe UI",9)).grid(row=1,column=0,sticky='w',padx=(0,4),pady=(4,0))
+        for i,(v,l) in enumerate([("builtin","Integre"),("script","Script")]):
+            tk.Radiobutton(opt, text=l, variable=self.engine_var, value=v,
+                           bg=PANEL, fg=TEXT, selectcolor=BG3,
+                           activebackground=PANEL, activeforeground=ACCENT,
+                           font=("Segoe UI",9)).grid(row=1,column=1+i,sticky='w',padx=2,pady=(4,0))
+        tk.Checkbutton(opt, text="Incremental", variable=self.incr_var,
+                       bg=PANEL, fg=TEXT, selectcolor=BG3,
+                       activebackground=PANEL, activeforeground=ACCENT,
+                       font=("Segoe UI",9)).grid(row=1,column=3,columnspan=2,sticky='w',pady=(4,0))
+
         # Bouton convert
         self.btn_conv = tk.Button(parent, text="  CONVERTIR",
                                    font=("Segoe UI",13,"bold"),
@@ -317,6 +546,19 @@ class App(tk.Tk):
                                    activebackground=ACCENT2, activeforeground="white")
         self.btn_conv.pack(fill='x', padx=10, pady=10)
 
+        section("Lot (plusieurs dossiers)")
+        lot = tk.Frame(parent, bg=PANEL)
+        lot.pack(fill='x', padx=10, pady=(2,0))
+        self.batch_list = tk.Listbox(lot, height=4, bg=BG2, fg=TEXT, relief='flat',
+                                     font=("Consolas",8), highlightthickness=1,
+                                     highlightbackground=BORDER, selectbackground=ACCENT)
+        self.batch_list.pack(fill='x')
+        lbtns = tk.Frame(lot, bg=PANEL)
+        lbtns.pack(fill='x', pady=(2,0))
+        self._vbtn(lbtns, "Ajouter", self._batch_add)
+        self._vbtn(lbtns, "Vider", self._batch_clear)
+        self._vbtn(lbtns, "Lancer le lot", self._run_batch)
+
         section("Console")
         self.console = scrolledtext.ScrolledText(
             parent, height=14, bg="#08081a", fg=GREEN,
@@ -348,10 +590,12 @@ class App(tk.Tk):
         return e
 
     def _vbtn(self, parent, text, cmd):
-        tk.Button(parent, text=text, command=cmd, bg=BG3, fg=TEXT,
-                  relief='flat', padx=8, pady=3, cursor="hand2",
-                  font=("Segoe UI",9),
-                  activebackground=ACCENT).pack(side='left', padx=2)
+        b = tk.Button(parent, text=text, command=cmd, bg=BG3, fg=TEXT,
+                      relief='flat', padx=8, pady=3, cursor="hand2",
+                      font=("Segoe UI",9),
+                      activebackground=ACCENT)
+        b.pack(side='left', padx=2)
+        return b
 
     # ── Browsing ─────────────────────────────────────────────────────────────
 
@@ -363,6 +607,7 @@ class App(tk.Tk):
                self.output_var.get() == "(meme dossier par defaut)":
                 self.output_var.set(d)
             self._log(f"Buffers : {d}", 'info')
+            threading.Thread(target=self._detect_thread, args=(d,), daemon=True).start()
 
     def _browse_output(self):
         d = filedialog.askdirectory(title="Dossier de sortie")
@@ -374,6 +619,57 @@ class App(tk.Tk):
             filetypes=[("Python","*.py"),("Tous","*.*")])
         if f: self.script_var.set(f)
 
+    def _detect_strides(self, folder):
+        """Strides detectes de tous les buffers du dossier (tries). Lent : hors du thread Tk."""
+        key = (folder, os.stat(folder).st_mtime_ns)
+        if key not in self._stride_cache:
+            # Dossier indexe : les draw calls identiques ne sont analyses qu'une fois
+            scan = self._scan if self._scan and self._scan['folder'] == folder else None
+            keys = migoto_scan.unique_keys(scan['draws']) if scan else None
+            meshes = migoto_decode.find_meshes(folder, log=lambda line: None, keys=keys)
+            self._stride_cache[key] = sorted({s for m in meshes for _, s, _ in m.vbs.values()})
+        return self._stride_cache[key]
+
+    def _detect_thread(self, folder):
+        try:
+            with self.viewer.prof.span('index', folder=folder):
+                scan = migoto_scan.scan(folder, log=lambda line: self._log(line, log_tag(line)))
+            self._scan = scan
+            self.after(0, self._show_draws, scan)
+        except OSError as e:
+            self._log(f"[WARN] Indexation : {e}", 'warn')
+        try:
+            strides = self._detect_strides(folder)
+            if strides: self._log(f"Stride auto : {', '.join(map(str, strides))}", 'info')
+        except Exception as e:
+            self._log(f"[WARN] Detection du stride : {e}", 'warn')
+
+    def _rescan(self):
+        folder = self.buffers_var.get().strip()
+        if os.path.isdir(folder):
+            threading.Thread(target=self._detect_thread, args=(folder,), daemon=True).start()
+
+    def _show_draws(self, scan):
+        """Liste des draw calls uniques ; les copies identiques sont regroupees (xN)."""
+        copies = {}
+        for d in scan['draws']:
+            if d['dup_of']: copies[d['dup_of']] = copies.get(d['dup_of'], 0) + 1
+        rows = [d for d in scan['draws'] if d['dup_of'] is None]
+        self._draw_keys = [d['key'] for d in rows]
+        self.draw_list.delete(0, 'end')
+        self.draw_list.insert('end', *[migoto_scan.describe(d, copies.get(d['key'], 0))
+                                       for d in rows])
+
+    def _selected_draws(self, folder):
+        """
+        Cles a convertir : les draw calls choisis et leurs copies identiques
+        (ecrites comme instances, sans decodage), None = tout le dossier.
+        """
+        picked = set(self._draw_keys[i] for i in self.draw_list.curselection())
+        if not picked or not self._scan or self._scan['folder'] != folder:
+            return None
+        return [d['key'] for d in self._scan['draws'] if (d['dup_of'] or d['key']) in picked]
+
     # ── Viewer ───────────────────────────────────────────────────────────────
 
     def _reload_viewer(self):
@@ -381,6 +677,26 @@ class App(tk.Tk):
             self._log("Pas de fichier OBJ disponible.", 'warn'); return
         self._load_obj_in_viewer(self._last_objs[0])
 
+    def _toggle_trace(self):
+        """Demarre l'enregistrement de la trace, ou l'arrete et l'ecrit en JSON."""
+        prof = self.viewer.prof
+        if not prof.recording:
+            prof.start_recording()
+            self.btn_trace.configure(text="Arreter trace", bg=ACCENT2)
+            self._log("Trace : enregistrement demarre", 'info')
+            return
+        prof.stop_recording()
+        self.btn_trace.configure(text="Trace", bg=BG3)
+        f = filedialog.asksaveasfilename(title="Enregistrer la trace", defaultextension=".json",
+                                         initialfile="migoto_trace.json",
+                                         filetypes=[("Trace JSON","*.json")])
+        if f:
+            try:
+                n = prof.save(f)
+                self._log(f"[OK] Trace : {n} evenements -> {f}", 'ok')
+            except OSError as e:
+                self._log(f"[ERR] Trace : {e}", 'err')
+
     def _reset_view(self):
         self.viewer.rot_x = 20.0
         self.viewer.rot_y = 0.0
@@ -388,29 +704,142 @@ class App(tk.Tk):
         self.viewer.pan_x = self.viewer.pan_y = 0.0
         self.viewer._draw()
 
-    def _load_obj_in_viewer(self, path):
+    def _load_obj_in_viewer(self, path, arrays=None):
+        """
+        Charge path dans la visionneuse sur un thread : avancement dans
+        lbl_mesh, apercus progressifs, abandon si un autre mesh est choisi.
+        arrays : tableaux deja decodes de ce fichier (pas de relecture).
+        """
         if not os.path.isfile(path):
             self._log(f"Fichier introuvable : {path}", 'err'); return
+        self._load_gen += 1
+        self._prefetch(None)    # arrete le prechargement en cours
+        gen = self._load_gen
+        prep = self.viewer.cache.get(self.viewer.cache_key(path))
+        if prep is not None:
+            self._load_done(gen, path, prep)
+            return
         self._log(f"Chargement viewer : {os.path.basename(path)}", 'info')
-        self.viewer.load_obj(path)
-        n = len(self.viewer.meshes)
-        self.lbl_mesh.configure(text=f"{os.path.basename(path)}  ({n} mesh)")
+        threading.Thread(target=self._load_thread, args=(gen, path, arrays),
+                         daemon=True).start()
+
+    def _load_thread(self, gen, path, arrays):
+        stale = lambda: gen != self._load_gen
+        name = os.path.basename(path)
+        def progress(frac, what):
+            self.after(0, self._load_progress, gen, f"{name}  {what} {frac:.0%}")
+        def preview(prep):
+            self.after(0, self._load_preview, gen, prep)
+        try:
+            with self.viewer.prof.span('chargement', file=name):
+                prep = self.viewer.prepare_file(path, arrays, progress, stale, preview)
+        except LoadCancelled:
+            return
+        except Exception as e:
+            self._log(f"[ERR] Viewer : {e}", 'err')
+            self.after(0, self._load_progress, gen, f"{name}  (erreur)")
+            return
+        self.after(0, self._load_done, gen, path, prep)
+
+    def _load_progress(self, gen, text):
+        if gen == self._load_gen:
+            self.lbl_mesh.configure(text=text)
+
+    def _load_preview(self, gen, prep):
+        if gen == self._load_gen:
+            # Vue reinitialisee au premier apercu seulement
+            self.viewer.show(prep, reset=self._preview_gen != gen)
+            self._preview_gen = gen
+
+    def _load_done(self, gen, path, prep):
+        if gen != self._load_gen:
+            return
+        self.viewer.show(prep, reset=self._preview_gen != gen)
+        self._preview_gen = gen
+        store = self.viewer.store
+        self.lbl_mesh.configure(text=f"{os.path.basename(path)}  ({len(store)} mesh, "
+                                     f"{store.nbytes/1e6:.1f} Mo)")
+        self._prefetch(path)
 
     def _on_mesh_select(self, e):
-        val = self.mesh_selector.get()
-        if val and val in [os.path.basename(p) for p in self._last_objs]:
-            for p in self._last_objs:
-                if os.path.basename(p) == val:
-                    self._load_obj_in_viewer(p)
-                    break
+        path = self._obj_by_name.get(self.mesh_selector.get())
+        if path:
+            self._load_obj_in_viewer(path)
+
+    def _prefetch(self, path):
+        """
+        Prepare en arriere-plan les PREFETCH entrees qui suivent path (None :
+        arrete). Le thread deja lance reprend la nouvelle liste ; le fichier
+        en cours est abandonne.
+        """
+        i = self._last_objs.index(path) if path in self._last_objs else None
+        with self._prefetch_lock:
+            self._prefetch_gen += 1
+            self._prefetch_todo = [] if i is None else self._last_objs[i+1:i+1+PREFETCH]
+            if not self._prefetch_todo or self._prefetch_busy:
+                return
+            self._prefetch_busy = True
+        threading.Thread(target=self._prefetch_thread, daemon=True).start()
+
+    def _prefetch_thread(self):
+        while True:
+            with self._prefetch_lock:
+                if not self._prefetch_todo:
+                    self._prefetch_busy = False
+                    return
+                p, gen = self._prefetch_todo.pop(0), self._prefetch_gen
+            try:
+                self.viewer.prepare_file(p, cancel=lambda: gen != self._prefetch_gen)
+            except LoadCancelled:
+                pass    # autre selection entre-temps
+            except Exception as e:
+                self._log(f"[WARN] Prechargement {os.path.basename(p)} : {e}", 'warn')
 
     # ── Conversion ───────────────────────────────────────────────────────────
 
+    def _open_logfile(self):
+        try:
+            path = migoto_decode.cache_path(LOG_FILE)
+            if os.path.isfile(path) and os.path.getsize(path) > LOG_MAX:
+                os.replace(path, path + '.1')
+            return open(path, 'a', encoding='utf-8')
+        except OSError as e:
+            print(f"Journal: {e}")
+            return None
+
     def _log(self, msg, tag=''):
-        self.console.configure(state='normal')
-        self.console.insert('end', msg+'\n', tag)
-        self.console.see('end')
-        self.console.configure(state='disabled')
+        """Met une ligne en file ; utilisable depuis n'importe quel thread."""
+        self._logq.put((msg, tag))
+
+    def _pump_log(self):
+        """Vide la file en un seul lot par tick (thread principal)."""
+        lines = []
+        try:
+            while True:
+                lines.append(self._logq.get_nowait())
+        except queue.Empty:
+            pass
+        if lines:
+            if self._logfile:
+                try:
+                    self._logfile.write(''.join(m + '\n' for m, _ in lines))
+                    self._logfile.flush()
+                except OSError:
+                    self._logfile = None
+            # Un flot de lignes : seules les dernieres seraient visibles de toute facon
+            lines = lines[-LOG_LINES:]
+            args = []
+            for m, tag in lines:
+                args += [m + '\n', tag]
+            c = self.console
+            c.configure(state='normal')
+            c.insert('end', *args)
+            extra = int(c.index('end-1c').split('.')[0]) - 1 - LOG_LINES
+            if extra > 0:
+                c.delete('1.0', f'{extra + 1}.0')
+            c.see('end')
+            c.configure(state='disabled')
+        self.after(LOG_TICK, self._pump_log)
 
     def _run(self):
         if self.running: return
@@ -420,6 +849,7 @@ class App(tk.Tk):
         script  = self.script_var.get().strip()
         stride  = self.stride_var.get().strip()
         fmt     = self.format_var.get()
+        engine  = self.engine_var.get()
 
         placeholders = ["(dossier contenant les .ib et .buf)",
                         "(meme dossier par defaut)",
@@ -427,19 +857,24 @@ class App(tk.Tk):
 
         if not buffers or buffers in placeholders or not os.path.isdir(buffers):
             self._log("[ERR] Dossier de buffers invalide !", 'err'); return
-        if not script or script in placeholders or not os.path.isfile(script):
+        if engine == 'script' and \
+           (not script or script in placeholders or not os.path.isfile(script)):
             self._log("[ERR] Script introuvable !", 'err'); return
 
+        if stride != "auto" and not stride.isdigit():
+            self._log("[ERR] Stride invalide !", 'err'); return
+
         if not output or output in placeholders:
             output = buffers
 
-        out_file = os.path.join(output, "output.obj")
-        cmd = [sys.executable, script,
-               "--buffers", buffers,
-               "--output",  out_file,
-               "--format",  fmt]
-        if stride != "auto":
-            cmd += ["--stride", stride]
+        keys = self._selected_draws(buffers)
+        if engine == 'builtin':
+            self._start_builtin(buffers, output, stride, fmt, keys)
+            return
+        if self.draw_list.curselection():
+            self._log("[WARN] Moteur script : tout le dossier est converti", 'warn')
+
+        stride = stride if stride == "auto" else int(stride)
 
         self._log(f"\n{'─'*40}", 'info')
         self._log(f"Lancement : {os.path.basename(script)}", 'info')
@@ -451,44 +886,162 @@ class App(tk.Tk):
         self._last_objs = []
         self.btn_conv.configure(text="  En cours...", state='disabled', bg=BG3)
         threading.Thread(target=self._run_thread,
-                         args=(cmd, output), daemon=True).start()
+                         args=(script, buffers, output, fmt, stride, self.incr_var.get()),
+                         daemon=True).start()
 
-    def _run_thread(self, cmd, out_dir):
+    def _start_builtin(self, buffers, output, stride, fmt, keys=None):
+        self._log(f"\n{'─'*40}", 'info')
+        self._log("Lancement : moteur integre", 'info')
+        self._log(f"Buffers   : {buffers}", 'info')
+        self._log(f"Sortie    : {output}", 'info')
+        if keys is not None:
+            self._log(f"Draw calls: {len(keys)} sur {len(self._scan['draws'])}", 'info')
+        self._log(f"{'─'*40}\n", 'info')
+
+        self.running = True
+        self._last_objs = []
+        self.btn_conv.configure(text="  En cours...", state='disabled', bg=BG3)
+        threading.Thread(target=self._builtin_thread,
+                         args=(buffers, output, None if stride == "auto" else int(stride),
+                               not self.incr_var.get(), fmt, keys),
+                         daemon=True).start()
+
+    def _builtin_thread(self, buffers, out_dir, stride, force, fmt, keys=None):
+        log = lambda line: self._log(line, log_tag(line))
         try:
-            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE,
-                                    stderr=subprocess.STDOUT,
-                                    text=True, encoding='utf-8', errors='replace')
-            for line in proc.stdout:
-                line = line.rstrip()
-                if not line: continue
-                tag = 'err'  if '[ERR]'  in line or 'Error' in line else \
-                      'ok'   if '[OK]'   in line or 'Termine' in line else \
-                      'warn' if '[WARN]' in line or 'SKIP'   in line else ''
-                self.after(0, self._log, line, tag)
-            proc.wait()
-
-            if proc.returncode == 0:
-                # Trouve les OBJ generes
-                objs = [os.path.join(out_dir, f)
-                        for f in os.listdir(out_dir) if f.endswith('.obj')]
-                objs.sort()
+            with self.viewer.prof.span('conversion', engine='builtin', folder=buffers):
+                done = migoto_decode.convert_folder(buffers, out_dir, stride, log, force, fmt,
+                                                    keys)
+            if done:
+                # Les tableaux decodes vont directement au viewer, sans relire l'OBJ
+                _, pos, tris = done[0]
+                first = None if pos is None else \
+                        (pos.copy(), tris, np.array([0, len(tris)], np.uint32))
+                self.after(0, self._on_conversion_done, [p for p, _, _ in done], first)
+                self._log("\nConversion terminee !", 'ok')
+            else:
+                self._log("\nAucun mesh converti.", 'err')
+        except Exception as e:
+            self._log(f"[ERR] {e}", 'err')
+        finally:
+            self.after(0, self._reset_btn)
+
+    def _run_thread(self, script, buffers, out_dir, fmt, stride, incremental):
+        try:
+            if stride == "auto":
+                # --stride vaut pour tout le dossier : passe seulement si tous
+                # les buffers detectes sont d'accord, sinon le script decide
+                strides = self._detect_strides(buffers)
+                stride = strides[0] if len(strides) == 1 else None
+                if stride: self._log(f"Stride auto : {stride}", 'info')
+            # Empreintes de toutes les entrees : hors du thread Tk
+            incr = migoto_batch.script_state(buffers, out_dir, script, fmt, stride)
+            if incr[0] and incremental:
+                objs = incr[1].outputs(migoto_manifest.SCRIPT_KEY)
+                self._log(f"[OK] 0 reconstruit(s), {len(objs)} a jour", 'ok')
+                self.after(0, self._on_conversion_done, objs)
+                return
+            args = migoto_batch.script_args(buffers, out_dir, fmt, stride)
+            with self.viewer.prof.span('conversion', engine='script', folder=buffers):
+                rc, objs = self._worker.run(script, args, out_dir,
+                                            lambda line: self._log(line, log_tag(line)))
+
+            if rc == 0:
+                _, manifest, inputs, options, version = incr
+                manifest.record(migoto_manifest.SCRIPT_KEY, inputs, options, version, objs)
+                manifest.save()
                 self.after(0, self._on_conversion_done, objs)
-                self.after(0, self._log, "\nConversion terminee !", 'ok')
+                self._log("\nConversion terminee !", 'ok')
             else:
-                self.after(0, self._log, "\nErreur lors de la conversion.", 'err')
+                self._log("\nErreur lors de la conversion.", 'err')
         except Exception as e:
-            self.after(0, self._log, f"[ERR] {e}", 'err')
+            self._log(f"[ERR] {e}", 'err')
         finally:
             self.after(0, self._reset_btn)
 
-    def _on_conversion_done(self, objs):
+    def _on_conversion_done(self, objs, first=None):
+        objs = [p for p in objs if p.lower().endswith(VIEW_EXTS)]   # pas les .fbx du script
         self._last_objs = objs
-        names = [os.path.basename(p) for p in objs]
+        content = {}
+        for d in {os.path.dirname(p) for p in objs}:
+            content.update(migoto_manifest.Manifest(d).contents())
+        for p in objs:      # sortie du moteur script : pas de cle, relue comme fichier
+            if p in content: self.viewer.content[p] = content[p]
+            else: self.viewer.content.pop(p, None)
+        # Les copies identiques sont signalees : elles partagent le meme mesh prepare
+        names, owner = [], {}
+        for p in objs:
+            c = content.get(p)
+            first_of = owner.setdefault(c, p) if c else p
+            names.append(os.path.basename(p) if first_of == p else
+                         f"{os.path.basename(p)}  = {os.path.basename(first_of)}")
+        self._obj_by_name = dict(zip(names, objs))
         self.mesh_selector['values'] = names
         if names: self.mesh_selector.set(names[0])
         if objs:
             self._log(f"Chargement dans la visionneuse...", 'info')
-            self._load_obj_in_viewer(objs[0])
+            self._load_obj_in_viewer(objs[0], first)
+
+    # ── Lot ──────────────────────────────────────────────────────────────────
+
+    def _batch_add(self):
+        d = filedialog.askdirectory(title="Dossier a ajouter au lot")
+        if d and d not in self._batch:
+            self._batch.append(d)
+            self.batch_list.insert('end', f"[ ] {d}")
+
+    def _batch_clear(self):
+        if self.running: return
+        self._batch = []
+        self.batch_list.delete(0, 'end')
+
+    def _run_batch(self):
+        if self.running or not self._batch: return
+        stride  = self.stride_var.get().strip()
+        output  = self.output_var.get().strip()
+        script  = self.script_var.get().strip()
+        engine  = self.engine_var.get()
+        if stride != "auto" and not stride.isdigit():
+            self._log("[ERR] Stride invalide !", 'err'); return
+        if engine == 'script' and not os.path.isfile(script):
+            self._log("[ERR] Script introuvable !", 'err'); return
+        root = output if os.path.isdir(output) else None
+        jobs = [migoto_batch.make_job(d, root, None if stride == "auto" else int(stride),
+                                      self.format_var.get(), engine, script,
+                                      not self.incr_var.get())
+                for d in self._batch]
+        self._log(f"\nLot : {len(jobs)} dossier(s), {os.cpu_count()} coeur(s)", 'info')
+        self.running = True
+        self.btn_conv.configure(text="  Lot en cours...", state='disabled', bg=BG3)
+        threading.Thread(target=self._batch_thread, args=(jobs,), daemon=True).start()
+
+    def _batch_thread(self, jobs):
+        try:
+            with self.viewer.prof.span('lot', folders=len(jobs)):
+                summary = migoto_batch.run_batch(
+                    jobs, on_event=lambda i, st, res: self.after(0, self._batch_event, i, st, res))
+            objs = [p for r in summary['results'] for p in r['outputs']]
+            self._log(f"\nLot termine : {summary['ok']} OK, "
+                      f"{summary['err']} erreur(s), {summary['time']:.1f} s",
+                      'ok' if not summary['err'] else 'warn')
+            if objs: self.after(0, self._on_conversion_done, objs)
+        except Exception as e:
+            self._log(f"[ERR] {e}", 'err')
+        finally:
+            self.after(0, self._reset_btn)
+
+    def _batch_event(self, i, status, res):
+        mark = {'queued': '...', 'retry': '<->', 'ok': 'OK', 'err': 'ERR'}[status]
+        color = {'ok': GREEN, 'err': ACCENT2, 'retry': YELLOW}.get(status, TEXT)
+        self.batch_list.delete(i)
+        self.batch_list.insert(i, f"[{mark}] {self._batch[i]}")
+        self.batch_list.itemconfigure(i, fg=color)
+        if status == 'ok':
+            self._log(f"[OK] {self._batch[i]} ({len(res['outputs'])} fichier(s), "
+                      f"{res['time']:.1f} s)", 'ok')
+        elif status in ('err', 'retry'):
+            self._log(f"[{'ERR' if status == 'err' else 'WARN'}] {self._batch[i]} : "
+                      f"{res['error']}", 'err' if status == 'err' else 'warn')
 
     def _reset_btn(self):
         self.running = False
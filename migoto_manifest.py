@@ -0,0 +1,107 @@
+"""
+Manifeste de conversion incrementale.
+Chaque dossier de sortie garde, pour chaque mesh produit, l'empreinte de ses
+fichiers d'entree (.ib/.buf/.ini...), les options et la version du
+convertisseur. Une nouvelle conversion ne refait que les meshes dont l'un
+de ces elements a change.
+"""
+
+import os, json, hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+MANIFEST   = '.migoto_manifest.json'
+CHUNK      = 1 << 20
+SCRIPT_KEY = '*script*'        # moteur script : tout le dossier d'un coup
+INPUT_EXTS = ('.ib', '.buf', '.ini', '.fmt', '.txt')   # .txt : layouts FrameAnalysis
+
+
+def folder_inputs(folder):
+    """Fichiers d'entree d'un dossier de buffers."""
+    return sorted(os.path.join(folder, n) for n in os.listdir(folder)
+                  if n.lower().endswith(INPUT_EXTS))
+
+
+def file_hash(path):
+    """blake2b du fichier, lu par blocs (hashlib relache le GIL : parallelisable)."""
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def hash_files(paths, known=None, workers=8):
+    """
+    {nom: {'size', 'mtime', 'hash'}} pour chaque fichier. Si taille et date
+    sont celles de known, l'empreinte connue est reprise sans relire.
+    """
+    known = known or {}
+    out, todo = {}, []
+    for p in paths:
+        st = os.stat(p)
+        name = os.path.basename(p)
+        prev = known.get(name)
+        if prev and prev['size'] == st.st_size and prev['mtime'] == st.st_mtime_ns:
+            out[name] = prev
+        else:
+            out[name] = {'size': st.st_size, 'mtime': st.st_mtime_ns, 'hash': None}
+            todo.append((name, p))
+    if todo:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(todo)))) as pool:
+            for (name, _), h in zip(todo, pool.map(file_hash, [p for _, p in todo])):
+                out[name]['hash'] = h
+    return out
+
+
+class Manifest:
+    """Manifeste JSON d'un dossier de sortie : cle de mesh -> entrees/options/sorties."""
+
+    def __init__(self, out_dir):
+        self.path = os.path.join(out_dir, MANIFEST)
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self.meshes = json.load(f).get('meshes', {})
+        except (OSError, ValueError):
+            self.meshes = {}
+
+    def known(self):
+        """Toutes les empreintes connues, par nom de fichier."""
+        out = {}
+        for m in self.meshes.values():
+            out.update(m.get('inputs', {}))
+        return out
+
+    def inputs(self, paths):
+        """Empreintes actuelles des entrees (reutilise celles du manifeste si possible)."""
+        return hash_files(paths, self.known())
+
+    def up_to_date(self, key, inputs, options, version):
+        prev = self.meshes.get(key)
+        if not prev or prev.get('version') != version or prev.get('options') != options:
+            return False
+        if {n: i['hash'] for n, i in prev['inputs'].items()} != \
+           {n: i['hash'] for n, i in inputs.items()}:
+            return False
+        # Rien d'enregistre (aucun fichier produit) : jamais a jour
+        outs = prev.get('outputs')
+        return bool(outs) and all(os.path.isfile(p) for p in outs)
+
+    def outputs(self, key):
+        return self.meshes.get(key, {}).get('outputs', [])
+
+    def contents(self):
+        """Fichier produit -> cle de contenu de son mesh."""
+        return {p: m['content'] for m in self.meshes.values() if m.get('content')
+                for p in m.get('outputs', [])}
+
+    def record(self, key, inputs, options, version, outputs, content=None):
+        self.meshes[key] = {'inputs': inputs, 'options': options,
+                            'version': version, 'outputs': list(outputs)}
+        if content:
+            self.meshes[key]['content'] = content
+
+    def save(self):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'meshes': self.meshes}, f, indent=1)
+        os.replace(tmp, self.path)
@@ -0,0 +1,81 @@
+"""
+Stockage compact des meshes de la visionneuse : un seul pool de sommets
+float32 pour tout le fichier (les indices OBJ sont globaux) et, pour chaque
+groupe, une vue uint32 sur ses triangles et sa couleur. Soit 12 octets par
+sommet et 12 par triangle, sans objet Python par element. Les volumes
+englobants du culling sont calcules par migoto_render.add_bounds.
+"""
+
+import numpy as np
+
+import migoto_render as render
+
+
+class Mesh:
+    """Un groupe : vue (sans copie) sur ses triangles dans le tableau du store."""
+    __slots__ = ('tris', 'color')
+
+    def __init__(self, tris, color):
+        self.tris  = tris
+        self.color = color
+
+    def __len__(self):
+        return len(self.tris)
+
+
+class MeshStore:
+    """
+    Pool de sommets (N,3) float32 + triangles (M,3) uint32 decoupes en groupes.
+    groups = debut de chaque groupe dans tris (G+1,), comme migoto_obj.load_obj.
+    """
+    __slots__ = ('verts', 'tris', 'meshes')
+
+    def __init__(self, verts, tris=None, groups=(), colors=('#7c5cfc',), count=None):
+        self.verts = np.ascontiguousarray(verts, np.float32).reshape(-1, 3)
+        self.tris  = np.zeros((0, 3), np.uint32) if tris is None else \
+                     np.ascontiguousarray(tris, np.uint32).reshape(-1, 3)
+        count = len(self.tris) if count is None else count
+        self.meshes = []
+        for i in range(len(groups)-1):
+            if groups[i] >= count: break
+            t = self.tris[groups[i]:min(groups[i+1], count)]
+            self.meshes.append(Mesh(t, colors[i % len(colors)]))
+
+    @classmethod
+    def single(cls, verts, tris, color='#7c5cfc'):
+        """Store d'un seul groupe."""
+        return cls(verts, tris, [0, len(tris)], (color,))
+
+    def head(self, count):
+        """Meme pool, limite aux count premiers triangles (apercu, sans copie)."""
+        store = MeshStore.__new__(MeshStore)
+        store.verts, store.tris, store.meshes = self.verts, self.tris, []
+        done = 0
+        for m in self.meshes:
+            if done >= count: break
+            t = m.tris[:count - done]
+            store.meshes.append(Mesh(t, m.color))
+            done += len(t)
+        return store
+
+    def __len__(self):
+        return len(self.meshes)
+
+    def __iter__(self):
+        return iter(self.meshes)
+
+    @property
+    def vertex_count(self):
+        return len(self.verts)
+
+    @property
+    def tri_count(self):
+        return sum(len(m) for m in self.meshes)
+
+    @property
+    def nbytes(self):
+        return self.verts.nbytes + self.tris.nbytes
+
+    def normalize(self, step=None):
+        """Centre et ramene le pool dans [-1, 1] (en place)."""
+        render.normalize(self.verts, step)
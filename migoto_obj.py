@@ -0,0 +1,214 @@
+"""
+Lecture rapide des OBJ pour la visionneuse + cache binaire a cote du fichier.
+Le fichier est lu d'un bloc puis parcouru par blocs de texte (avancement,
+abandon et apercus entre deux). Dans un bloc, les lignes v/f/o/g sont
+reperees octet par octet avec NumPy et leurs valeurs decodees d'un coup :
+pas de boucle Python par ligne, sauf repli sur les lignes irregulieres.
+Le cache (.vcache) contient positions float32, indices uint32 et debuts de
+groupes ; il est invalide si le chemin, la taille ou la date de
+modification de l'OBJ changent.
+"""
+
+import os, re, struct, warnings
+
+import numpy as np
+
+CACHE_EXT     = '.vcache'
+CACHE_MAGIC   = b'MGOC'
+CACHE_VERSION = 1
+BLOCK         = 4 << 20   # octets de texte par bloc de parsing (~0.2 s)
+
+_HDR     = struct.Struct('<4sIQqIII')   # magic, version, taille, mtime_ns, nv, nt, ng
+_RE_LEAD = re.compile(rb'^[ \t]+', re.M)
+_RE_TAIL = re.compile(rb'/[^ \t\r\n]*')  # "12/5/3" -> "12"
+
+
+# =============================================================================
+# PARSING
+# =============================================================================
+
+def _numbers(text, dtype):
+    """np.fromstring strict : None si une valeur n'est pas lisible."""
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        try:
+            return np.fromstring(text, dtype=dtype, sep=' ')
+        except (ValueError, DeprecationWarning):
+            return None
+
+
+def _bodies(a, starts, ends, sel):
+    """Texte des lignes sel sans leur mot-cle (2 octets), chacune terminee par \\n."""
+    mask = np.repeat(sel, ends - starts + 1)
+    mask[starts[sel]] = mask[starts[sel] + 1] = False
+    return a[mask].tobytes()
+
+
+def _decode(text, n, dtype, ncols):
+    """
+    n lignes 'a b c ...' (texte de _bodies) -> tableau (n, ncols).
+    Les valeurs sont comptees par ligne sur les octets ; si chaque ligne en a
+    exactement ncols, tout est lu d'un appel, sinon repli ligne par ligne.
+    """
+    if not n:
+        return np.zeros((0, ncols), dtype)
+    t = np.frombuffer(text, np.uint8)
+    blank = t <= 32
+    first = ~blank
+    first[1:] &= blank[:-1]
+    # Valeurs avant chaque fin de ligne -> valeurs par ligne
+    per_line = np.diff(np.searchsorted(np.flatnonzero(first), np.flatnonzero(t == 10)),
+                       prepend=0)
+    if (per_line == ncols).all():
+        flat = _numbers(text, dtype)
+        if flat is not None and len(flat) == n*ncols:
+            return flat.reshape(n, ncols)
+    # Nombre de composantes variable (w, couleurs, quads...) : on garde
+    # les ncols premieres, les lignes illisibles ou trop courtes sautent
+    conv = float if np.dtype(dtype).kind == 'f' else int
+    rows = []
+    for b in text.split(b'\n')[:n]:
+        r = b.split()[:ncols]
+        if len(r) < ncols: continue
+        try: rows.append([conv(x) for x in r])
+        except ValueError: pass
+    return np.array(rows, dtype=dtype).reshape(-1, ncols)
+
+
+def _face_ok(body):
+    r = _RE_TAIL.sub(b'', body).split()[:3]
+    return len(r) == 3 and all(x.lstrip(b'-').isdigit() for x in r)
+
+
+def _blocks(data, size=BLOCK):
+    """(fin, bloc) : morceaux de data coupes apres un saut de ligne."""
+    i = 0
+    while i < len(data):
+        j = data.find(b'\n', min(i + size, len(data)))
+        j = len(data) if j < 0 else j + 1
+        yield j, data[i:j]
+        i = j
+
+
+def _indices(tris):
+    """Indices OBJ (base 1) -> uint32 ; negatifs / relatifs non geres -> invalides."""
+    tris = tris - 1
+    tris[tris < 0] = 0xFFFFFFFF
+    return tris.astype(np.uint32)
+
+
+def parse_obj(data, step=None):
+    """
+    Parse le contenu brut d'un OBJ.
+    Retourne (verts float32 (N,3), tris uint32 (M,3), groups uint32 (G+1,))
+    ou groups donne le premier triangle de chaque groupe non vide.
+    step(fraction, partiel) est appele apres chaque bloc ; partiel() donne
+    (verts, tris) deja lus. step peut lever une exception pour abandonner.
+    """
+    verts, tris, before, oks = [], [], [], []
+    nfaces = 0
+    partial = lambda: (np.concatenate(verts).astype(np.float32, copy=False),
+                       _indices(np.concatenate(tris)))
+    for end, blk in _blocks(data):
+        if blk[:1] in (b' ', b'\t') or b'\n ' in blk or b'\n\t' in blk:
+            blk = _RE_LEAD.sub(b'', blk)
+        if not blk.endswith(b'\n'):
+            blk += b'\n'
+        # Lignes : mot-cle = 1er octet suivi d'un blanc
+        a = np.frombuffer(blk, np.uint8)
+        ends   = np.flatnonzero(a == 10)
+        starts = np.concatenate([[0], ends[:-1] + 1])
+        kind   = a[starts]
+        sep    = a[np.minimum(starts + 1, len(a) - 1)]
+        sep    = (sep == 32) | (sep == 9)
+        is_v   = sep & (kind == ord('v'))
+        is_f   = sep & (kind == ord('f'))
+        is_og  = sep & ((kind == ord('o')) | (kind == ord('g')))
+        seen_f = np.cumsum(is_f)
+        nf     = int(seen_f[-1])
+        verts.append(_decode(_bodies(a, starts, ends, is_v), int(is_v.sum()), np.float32, 3))
+        faces = _bodies(a, starts, ends, is_f)
+        if b'/' in faces:
+            faces = _RE_TAIL.sub(b'', faces)
+        tris.append(_decode(faces, nf, np.int64, 3))
+        # Faces vues avant chaque ligne o/g
+        before.append(nfaces + seen_f[is_og])
+        nfaces += nf
+        # Les faces ignorees par _decode (< 3 coins, illisibles) : pour recaler
+        oks.append(np.ones(nf, bool) if len(tris[-1]) == nf else
+                   np.fromiter((_face_ok(f) for f in faces.split(b'\n')[:nf]), bool, nf))
+        if step: step(end/len(data), partial)
+    if not verts:
+        return np.zeros((0, 3), np.float32), np.zeros((0, 3), np.uint32), np.zeros(1, np.uint32)
+    verts, tris = partial()
+    before, ok = np.concatenate(before), np.concatenate(oks)
+
+    # Debuts de groupes = nombre de faces vues avant chaque ligne o/g
+    if not ok.all():
+        before = np.concatenate([[0], np.cumsum(ok)])[before]
+    groups = np.unique(np.concatenate([[0], before, [len(tris)]]))
+    groups = groups[(groups >= 0) & (groups <= len(tris))]
+    return verts, tris, groups.astype(np.uint32)
+
+
+# =============================================================================
+# CACHE BINAIRE
+# =============================================================================
+
+def _key(path):
+    st = os.stat(path)
+    return os.path.abspath(path).encode('utf-8'), st.st_size, st.st_mtime_ns
+
+
+def read_cache(path):
+    """Relit le cache d'un OBJ en une lecture, ou None s'il est absent/perime."""
+    try:
+        apath, size, mtime = _key(path)
+        with open(path + CACHE_EXT, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    if len(data) < _HDR.size + 4:
+        return None
+    magic, ver, c_size, c_mtime, nv, nt, ng = _HDR.unpack_from(data)
+    plen = struct.unpack_from('<I', data, _HDR.size)[0]
+    off  = _HDR.size + 4
+    if (magic, ver, c_size, c_mtime) != (CACHE_MAGIC, CACHE_VERSION, size, mtime) \
+       or data[off:off+plen] != apath:
+        return None
+    off += plen
+    if len(data) != off + nv*12 + nt*12 + ng*4:
+        return None
+    verts  = np.frombuffer(data, np.float32, nv*3, off).reshape(-1, 3); off += nv*12
+    tris   = np.frombuffer(data, np.uint32,  nt*3, off).reshape(-1, 3); off += nt*12
+    groups = np.frombuffer(data, np.uint32,  ng,   off)
+    return verts.copy(), tris, groups
+
+
+def write_cache(path, verts, tris, groups):
+    apath, size, mtime = _key(path)
+    tmp = path + CACHE_EXT + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(_HDR.pack(CACHE_MAGIC, CACHE_VERSION, size, mtime,
+                          len(verts), len(tris), len(groups)))
+        f.write(struct.pack('<I', len(apath)) + apath)
+        f.write(np.ascontiguousarray(verts,  np.float32).tobytes())
+        f.write(np.ascontiguousarray(tris,   np.uint32).tobytes())
+        f.write(np.ascontiguousarray(groups, np.uint32).tobytes())
+    os.replace(tmp, path + CACHE_EXT)
+
+
+def load_obj(path, use_cache=True, step=None):
+    """Charge un OBJ (via le cache si valide) -> (verts, tris, groups). step : voir parse_obj."""
+    if use_cache:
+        hit = read_cache(path)
+        if hit is not None:
+            return hit
+    with open(path, 'rb') as f:
+        res = parse_obj(f.read(), step)
+    if use_cache:
+        try:
+            write_cache(path, *res)
+        except OSError as e:
+            print(f"Cache OBJ: {e}")
+    return res
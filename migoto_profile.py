@@ -0,0 +1,124 @@
+"""
+Profilage de la visionneuse : duree de chaque etape d'une image, temps
+d'image (dernier, moyen, p95), triangles dessines / ecartes, et trace de
+session exportable au format Chrome Trace (chrome://tracing, Perfetto).
+Independant de tkinter.
+"""
+
+import os, json, time, threading
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+HISTORY    = 240       # images gardees pour moyenne / p95
+MAX_EVENTS = 500000    # evenements de trace au plus (session bornee)
+
+
+class Profiler:
+    def __init__(self, history=HISTORY):
+        self.enabled   = False   # incrustation visible
+        self.recording = False   # evenements de trace enregistres
+        self.frames = deque(maxlen=history)   # duree totale des dernieres images (s)
+        self.stages = {}         # etape -> duree dans l'image en cours / derniere
+        self.counts = {}         # compteur -> valeur dans l'image en cours / derniere
+        self.events = []
+        self._lock  = threading.Lock()
+        self._t0    = time.perf_counter()
+        self._start = None
+
+    # ── Images ───────────────────────────────────────────────────────────────
+
+    def begin_frame(self):
+        self.stages, self.counts = {}, {}
+        self._start = time.perf_counter()
+
+    def end_frame(self):
+        if self._start is None:
+            return
+        dt = time.perf_counter() - self._start
+        self.frames.append(dt)
+        if self.recording:
+            self._event('image', 'frame', self._start, dt,
+                        dict(self.counts, **{k: round(v*1e3, 3) for k, v in self.stages.items()}))
+        self._start = None
+
+    @contextmanager
+    def stage(self, name):
+        """Chronometre une etape de l'image en cours (cumule si repetee)."""
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            dt = time.perf_counter() - t
+            self.stages[name] = self.stages.get(name, 0.0) + dt
+            if self.recording:
+                self._event(name, 'frame', t, dt)
+
+    def count(self, **values):
+        for k, v in values.items():
+            self.counts[k] = self.counts.get(k, 0) + int(v)
+
+    def stats(self):
+        """{'last', 'avg', 'p95', 'fps'} en secondes (fps = 1 / moyenne)."""
+        if not self.frames:
+            return None
+        t = np.fromiter(self.frames, float)
+        avg = float(t.mean())
+        return {'last': float(t[-1]), 'avg': avg, 'p95': float(np.percentile(t, 95)),
+                'fps': 1.0/avg if avg else 0.0}
+
+    def overlay(self):
+        """Texte de l'incrustation (une ligne par information)."""
+        s = self.stats()
+        if s is None:
+            return "profil : aucune image"
+        lines = [f"image {s['last']*1e3:6.1f} ms  moy {s['avg']*1e3:6.1f}  "
+                 f"p95 {s['p95']*1e3:6.1f}  {s['fps']:5.1f} fps"]
+        if 'drawn' in self.counts or 'culled' in self.counts:
+            lines.append(f"dessines {self.counts.get('drawn', 0)}  "
+                         f"ecartes {self.counts.get('culled', 0)}")
+        lines += [f"  {k:<8} {v*1e3:6.2f} ms" for k, v in self.stages.items()]
+        if self.recording:
+            lines.append(f"trace : {len(self.events)} evenements")
+        return '\n'.join(lines)
+
+    # ── Trace de session ─────────────────────────────────────────────────────
+
+    def _event(self, name, cat, start, dur, args=None):
+        ev = {'name': name, 'cat': cat, 'ph': 'X', 'pid': os.getpid(),
+              'tid': threading.get_ident(),
+              'ts': round((start - self._t0)*1e6, 1), 'dur': round(dur*1e6, 1)}
+        if args:
+            ev['args'] = args
+        with self._lock:
+            if len(self.events) < MAX_EVENTS:
+                self.events.append(ev)
+
+    @contextmanager
+    def span(self, name, cat='app', **args):
+        """Intervalle hors image (chargement, conversion...), depuis n'importe quel thread."""
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.recording:
+                self._event(name, cat, t, time.perf_counter() - t, args)
+
+    def start_recording(self):
+        with self._lock:
+            self.events = []
+        self.recording = True
+
+    def stop_recording(self):
+        self.recording = False
+
+    def save(self, path):
+        """Ecrit la trace (format Chrome Trace Event)."""
+        with self._lock:
+            events = list(self.events)
+        meta = [{'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': t.ident,
+                 'args': {'name': t.name}} for t in threading.enumerate()]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': meta + events, 'displayTimeUnit': 'ms'}, f)
+        return len(events)
@@ -0,0 +1,447 @@
+"""
+Coeur de rendu vectorise (NumPy) de la visionneuse 3D.
+Independant de tkinter : transformation, culling, ombrage et tri des triangles.
+"""
+
+from contextlib import nullcontext
+
+import numpy as np
+
+FOV   = 600
+LIGHT = np.array([0.5, 0.8, 0.3])
+NEAR  = 0.01   # profondeur minimale (camera a z = -3)
+
+
+# =============================================================================
+# PREPARATION (une seule fois au chargement)
+# =============================================================================
+
+def hex_to_rgb(color):
+    return int(color[1:3],16), int(color[3:5],16), int(color[5:7],16)
+
+
+SHADE_CHUNK = 1 << 18   # triangles par bloc (memoire temporaire bornee)
+
+
+def shade(verts, tris, color):
+    """
+    Couleur ombree de chaque triangle (independante de la vue) -> rgb uint8 (M,3).
+    """
+    base = np.array(hex_to_rgb(color), np.float32)
+    rgb  = np.empty((len(tris), 3), np.uint8)
+    for i in range(0, len(tris), SHADE_CHUNK):
+        t = tris[i:i+SHADE_CHUNK]
+        va, vb, vc = verts[t[:,0]], verts[t[:,1]], verts[t[:,2]]
+        e, f = vb-va, vc-va
+        # Meme convention que l'ancien calcul scalaire (composantes permutees)
+        n = np.stack([e[:,0]*f[:,1] - e[:,1]*f[:,0],
+                      e[:,1]*f[:,2] - e[:,2]*f[:,1],
+                      e[:,2]*f[:,0] - e[:,0]*f[:,2]], axis=1)
+        nlen = np.sqrt((n*n).sum(axis=1))
+        nlen[nlen == 0] = 1
+        diff = np.maximum(0, (n/nlen[:,None]) @ LIGHT)
+        rgb[i:i+SHADE_CHUNK] = np.minimum(base[None,:]*(0.2 + 0.8*diff)[:,None], 255)
+    return rgb
+
+
+def hex_colors(rgb):
+    """'#rrggbb' de chaque ligne de rgb (K,3), pour le canvas."""
+    packed = (rgb[:,0].astype(np.int64)<<16) | (rgb[:,1].astype(np.int64)<<8) | rgb[:,2]
+    # Peu de teintes distinctes : on ne formate que les valeurs uniques
+    uniq, inv = np.unique(packed, return_inverse=True)
+    names = np.array(['#%06x' % u for u in uniq.tolist()], dtype=object)
+    return names[inv.ravel()]
+
+
+NORM_CHUNK = 1 << 18   # sommets par bloc de normalisation
+
+
+def normalize(verts, step=None, chunk=NORM_CHUNK):
+    """
+    Centre verts (N,3) sur son centroide et le ramene dans [-1, 1], en place.
+    Boite englobante et somme sont cumulees bloc par bloc en une passe de
+    lecture, puis la transformation est appliquee bloc par bloc.
+    step(fraction) est appele apres chaque bloc (il peut lever pour annuler).
+    Retourne (centre, echelle) : v' = (v - centre)*echelle.
+    """
+    n = len(verts)
+    if not n:
+        return np.zeros(3), 1.0
+    lo, hi = np.full(3, np.inf), np.full(3, -np.inf)
+    total  = np.zeros(3)
+    for i in range(0, n, chunk):
+        b = verts[i:i+chunk]
+        lo = np.minimum(lo, b.min(axis=0))
+        hi = np.maximum(hi, b.max(axis=0))
+        total += b.sum(axis=0, dtype=np.float64)
+        if step: step(0.5*min(n, i+chunk)/n)
+    c = total/n
+    s = 1.0/(max(np.abs(hi - c).max(), np.abs(lo - c).max()) or 1)
+    c = c.astype(verts.dtype)
+    for i in range(0, n, chunk):
+        b = verts[i:i+chunk]
+        b -= c
+        b *= s
+        if step: step(0.5 + 0.5*min(n, i+chunk)/n)
+    return c, s
+
+
+def build_scene(store):
+    """
+    Tableaux plats d'un MeshStore (voir migoto_mesh) : sommets (pool partage,
+    sans copie), triangles (M,3) uint32 et couleur ombree rgb par triangle.
+    Les indices hors bornes sont ecartes ici plutot qu'a chaque image.
+    """
+    v, n = store.verts, len(store.verts)
+    all_t, all_c = [], []
+    for m in store.meshes:
+        t = m.tris
+        ok = (t[:,0] < n) & (t[:,1] < n) & (t[:,2] < n)
+        if not ok.all():
+            t = t[ok]
+        if len(t):
+            all_c.append(shade(v, t, m.color))
+            all_t.append(t)
+    if not all_t:
+        return None
+    scene = {'verts': v,
+             'tris':  np.concatenate(all_t),
+             'rgb':   np.concatenate(all_c)}
+    return add_bounds(scene, [len(t) for t in all_t])
+
+
+CHUNK_TRIS = 2048   # triangles par chunk (volume englobant)
+
+
+def _spread(v):
+    """10 bits -> 30 bits espaces de 3 (code de Morton)."""
+    v = (v | (v << 16)) & 0x030000FF
+    v = (v | (v << 8))  & 0x0300F00F
+    v = (v | (v << 4))  & 0x030C30C3
+    return (v | (v << 2)) & 0x09249249
+
+
+def _spheres(lo, hi):
+    """Spheres englobantes (centre, rayon) de boites (lo, hi)."""
+    return (lo + hi)*0.5, np.sqrt(((hi - lo)**2).sum(axis=1))*0.5
+
+
+def add_bounds(scene, sizes=None, chunk=CHUNK_TRIS):
+    """
+    Volumes englobants pour le culling : dans chaque mesh (sizes = nombre de
+    triangles de chaque mesh, consecutifs), les triangles sont tries selon
+    le code de Morton de leur centre puis groupes par chunk de `chunk`
+    triangles. Ajoute a la scene les spheres des chunks et des meshes.
+    """
+    v, t = scene['verts'], scene['tris']
+    sizes = [n for n in ([len(t)] if sizes is None else sizes) if n]   # meshes vides ignores
+    if not sizes:
+        return scene                                      # pas de volumes : tout est "visible"
+    tlo, thi = np.empty((len(t), 3), np.float32), np.empty((len(t), 3), np.float32)
+    for k in range(3):                                    # boite de chaque triangle
+        a, b, c = v[t[:,0], k], v[t[:,1], k], v[t[:,2], k]
+        tlo[:, k] = np.minimum(np.minimum(a, b), c)
+        thi[:, k] = np.maximum(np.maximum(a, b), c)
+    order, starts, mesh_chunks, base = [], [], [0], 0
+    for n in sizes:
+        lo, hi = tlo[base:base+n], thi[base:base+n]
+        c = (lo + hi)*0.5
+        m0 = c.min(axis=0)
+        q = ((c - m0)*(1023/(float((c.max(axis=0) - m0).max()) or 1))).astype(np.int64)
+        order.append(base + np.argsort((_spread(q[:,0]) << 2) | (_spread(q[:,1]) << 1)
+                                       | _spread(q[:,2]), kind='stable'))
+        starts.append(np.arange(base, base+n, chunk))
+        mesh_chunks.append(mesh_chunks[-1] + len(starts[-1]))
+        base += n
+    order = np.concatenate(order)
+    for k in ('tris', 'rgb'):
+        scene[k] = scene[k][order]
+    tlo, thi = tlo[order], thi[order]
+    starts = np.concatenate(starts)
+    clo, chi = np.minimum.reduceat(tlo, starts), np.maximum.reduceat(thi, starts)
+    mesh_chunks = np.array(mesh_chunks)
+    ms = mesh_chunks[:-1]
+    scene['chunks'] = np.append(starts, len(t))           # debut de chaque chunk + fin
+    scene['chunk_center'], scene['chunk_radius'] = _spheres(clo, chi)
+    scene['mesh_chunks'] = mesh_chunks                    # premier chunk de chaque mesh + fin
+    scene['mesh_center'], scene['mesh_radius'] = _spheres(
+        np.minimum.reduceat(clo, ms), np.maximum.reduceat(chi, ms))
+    return scene
+
+
+# =============================================================================
+# NIVEAUX DE DETAIL (proxies pour l'interaction)
+# =============================================================================
+
+LOD_BUDGETS = (100000, 25000, 6000)   # triangles vises par proxy
+
+
+def cluster_decimate(verts, tris, cells):
+    """
+    Decimation par regroupement de sommets sur une grille cells^3 : chaque
+    cellule devient un sommet (moyenne), les triangles degeneres et doublons
+    disparaissent. Retourne (verts, tris, src) ou src donne pour chaque
+    triangle garde son indice dans tris.
+    """
+    lo   = verts.min(axis=0)
+    span = float((verts.max(axis=0) - lo).max()) or 1.0
+    q    = np.minimum(((verts - lo)*(cells/span)).astype(np.int64), cells-1)
+    key  = (q[:,0]*cells + q[:,1])*cells + q[:,2]
+    _, cid = np.unique(key, return_inverse=True)
+    cid  = cid.ravel()
+    cnt  = np.bincount(cid)
+    nv   = np.stack([np.bincount(cid, verts[:,k]) for k in range(3)], axis=1)/cnt[:,None]
+    t    = cid[tris]
+    ok   = (t[:,0] != t[:,1]) & (t[:,1] != t[:,2]) & (t[:,0] != t[:,2])
+    src  = np.flatnonzero(ok)
+    st   = np.sort(t[ok], axis=1)
+    n    = len(cnt)
+    if n < (1 << 21):
+        _, first = np.unique((st[:,0]*n + st[:,1])*n + st[:,2], return_index=True)
+    else:
+        _, first = np.unique(st, axis=0, return_index=True)
+    first.sort()
+    return nv.astype(np.float32), t[ok][first], src[first]
+
+
+def build_lods(scene, budgets=LOD_BUDGETS):
+    """
+    Proxies decimes de la scene, du plus fin au plus grossier. Chaque proxy
+    est decime a partir du precedent ; les couleurs sont reprises du
+    triangle d'origine.
+    """
+    lods = []
+    v, t, src = scene['verts'], scene['tris'], np.arange(len(scene['tris']))
+    for target in sorted(budgets, reverse=True):
+        if target >= len(t): continue
+        cells = max(2, int(np.sqrt(target)))
+        for _ in range(6):
+            nv, nt, keep = cluster_decimate(v, t, cells)
+            if len(nt) <= target: break
+            cells = max(2, int(cells*np.sqrt(target/len(nt))*0.9))
+        if not len(nt):
+            break                   # tout a disparu : niveaux plus grossiers inutiles
+        v, t, src = nv, nt, src[keep]
+        lods.append(add_bounds({'verts': v, 'tris': t, 'rgb': scene['rgb'][src]}))
+    return lods
+
+
+# =============================================================================
+# PAR IMAGE
+# =============================================================================
+
+def view_matrix(rot_x, rot_y):
+    """Rotation X puis Y, en une seule matrice 3x3."""
+    rx, ry = np.radians(rot_x), np.radians(rot_y)
+    cx, sx, cy, sy = np.cos(rx), np.sin(rx), np.cos(ry), np.sin(ry)
+    return np.array([[ cy, sx*sy, cx*sy],
+                     [  0,    cx,   -sx],
+                     [-sy, sx*cy, cx*cy]])
+
+
+def project(verts, rot_x, rot_y, zoom, pan_x, pan_y, w, h, fov=FOV):
+    """Projette tous les sommets d'un coup -> (px, py, pz)."""
+    p  = verts @ view_matrix(rot_x, rot_y).T
+    pz = np.maximum(p[:,2] + 3.0, 0.01)
+    d  = fov*zoom
+    px =  p[:,0]*d/pz + w/2 + pan_x
+    py = -p[:,1]*d/pz + h/2 + pan_y
+    return px, py, pz
+
+
+def _stage(prof, name):
+    """Etape chronometree si un profileur (migoto_profile.Profiler) est fourni."""
+    return prof.stage(name) if prof is not None else nullcontext()
+
+
+def in_view(center, radius, rot_x, rot_y, zoom, pan_x, pan_y, w, h, fov=FOV):
+    """
+    Spheres au moins en partie dans le champ : devant le plan proche et du
+    bon cote des 4 plans passant par la camera et les bords de l'ecran.
+    """
+    p = center @ view_matrix(rot_x, rot_y).T
+    X, Y, Z = p[:,0], p[:,1], p[:,2] + 3.0
+    d = fov*zoom
+    left, top = w/2 + pan_x, h/2 + pan_y          # centre de projection -> bords
+    ok = Z + radius >= NEAR
+    for nx, ny, nz in ((d, 0, left), (-d, 0, w - left), (0, -d, top), (0, d, h - top)):
+        ok &= nx*X + ny*Y + nz*Z >= -radius*np.sqrt(nx*nx + ny*ny + nz*nz)
+    return ok
+
+
+def visible_tris(scene, rot_x, rot_y, zoom, pan_x, pan_y, w, h):
+    """
+    Indices des triangles des chunks dans le champ (meshes d'abord, puis
+    leurs chunks), ou None si tout est visible.
+    """
+    if 'chunks' not in scene:
+        return None
+    view = (rot_x, rot_y, zoom, pan_x, pan_y, w, h)
+    mesh = in_view(scene['mesh_center'], scene['mesh_radius'], *view)
+    cand = np.flatnonzero(np.repeat(mesh, np.diff(scene['mesh_chunks'])))
+    vis  = np.zeros(len(scene['chunk_radius']), bool)
+    vis[cand] = in_view(scene['chunk_center'][cand], scene['chunk_radius'][cand], *view)
+    if vis.all():
+        return None
+    return np.flatnonzero(np.repeat(vis, np.diff(scene['chunks'])))
+
+
+def screen_tris(scene, rot_x, rot_y, zoom, pan_x, pan_y, w, h, prof=None):
+    """
+    Triangles de face, dans l'ecran et couvrant au moins un centre de pixel,
+    en coordonnees ecran. Les chunks hors champ sont ecartes avant toute
+    projection ; seuls les sommets de leurs triangles sont projetes.
+    Retourne (keep (K,) indices de triangles, x (K,3), y (K,3), z (K,3)).
+    """
+    view = (rot_x, rot_y, zoom, pan_x, pan_y, w, h)
+    verts, t = scene['verts'], scene['tris']
+    with _stage(prof, 'frustum'):
+        ids = visible_tris(scene, *view)
+        if ids is not None:
+            t = t[ids]
+            used = np.zeros(len(verts), bool)
+            used[t.ravel()] = True
+            vid = np.flatnonzero(used)
+    with _stage(prof, 'project'):
+        if ids is None:
+            px, py, pz = project(verts, *view)
+        else:
+            px, py, pz = (np.empty(len(verts)) for _ in range(3))
+            px[vid], py[vid], pz[vid] = project(verts[vid], *view)
+    with _stage(prof, 'cull'):
+        xa, xb, xc = px[t[:,0]], px[t[:,1]], px[t[:,2]]
+        ya, yb, yc = py[t[:,0]], py[t[:,1]], py[t[:,2]]
+        # Backface culling (produit vectoriel 2D)
+        on = (xb-xa)*(yc-ya) - (yb-ya)*(xc-xa) <= 0
+        # Hors ecran, ou aucun centre de pixel (i+0.5) dans la boite : rien a dessiner
+        x0, x1 = np.minimum(np.minimum(xa, xb), xc), np.maximum(np.maximum(xa, xb), xc)
+        y0, y1 = np.minimum(np.minimum(ya, yb), yc), np.maximum(np.maximum(ya, yb), yc)
+        on &= (x1 >= 0) & (x0 < w) & (y1 >= 0) & (y0 < h)
+        on &= np.floor(x1 - 0.5) >= np.ceil(x0 - 0.5)
+        on &= np.floor(y1 - 0.5) >= np.ceil(y0 - 0.5)
+        k = np.flatnonzero(on)
+        tk = t[k]
+        out = (k if ids is None else ids[k]), px[tk], py[tk], pz[tk]
+    if prof is not None:
+        prof.count(drawn=len(k), culled=len(scene['tris']) - len(k))
+    return out
+
+
+def render_frame(scene, rot_x, rot_y, zoom, pan_x, pan_y, w, h, prof=None):
+    """
+    Triangles visibles tries du plus lointain au plus proche (painter's).
+    Retourne (coords (K,6), fills (K,)).
+    """
+    keep, x, y, z = screen_tris(scene, rot_x, rot_y, zoom, pan_x, pan_y, w, h, prof)
+    with _stage(prof, 'sort'):
+        order = np.argsort(-z.sum(axis=1), kind='stable')
+        coords = np.stack([x[order,0], y[order,0], x[order,1], y[order,1],
+                           x[order,2], y[order,2]], axis=1)
+        return coords, hex_colors(scene['rgb'][keep[order]])
+
+
+# =============================================================================
+# RASTERIZER (Z-BUFFER)
+# =============================================================================
+
+FRAG_BUDGET = 1 << 21   # fragments candidats traites par lot
+
+
+def rasterize(x, y, z, rgb, img):
+    """
+    Remplit img (h,w,3) uint8 avec les triangles (x,y,z : (K,3) ecran) en
+    gardant le plus proche par pixel. Les triangles sont regroupes par
+    taille de boite englobante (puissances de 2) pour traiter chaque lot
+    sur une grille commune de k*k pixels.
+    """
+    h, w = img.shape[:2]
+    flat = img.reshape(-1, 3)
+    zbuf = np.zeros(h*w, np.float32)        # 1/z, 0 = rien dessine
+    iz   = (1.0/z).astype(np.float32)
+
+    x0 = np.floor(x.min(axis=1)).astype(np.int64).clip(0, w-1)
+    y0 = np.floor(y.min(axis=1)).astype(np.int64).clip(0, h-1)
+    x1 = np.floor(x.max(axis=1)).astype(np.int64).clip(0, w-1)
+    y1 = np.floor(y.max(axis=1)).astype(np.int64).clip(0, h-1)
+    area = (x[:,1]-x[:,0])*(y[:,2]-y[:,0]) - (y[:,1]-y[:,0])*(x[:,2]-x[:,0])
+    on = (x.max(axis=1) >= 0) & (x.min(axis=1) < w) & \
+         (y.max(axis=1) >= 0) & (y.min(axis=1) < h) & (area != 0)
+
+    size = np.maximum(x1-x0, y1-y0) + 1
+    kbits = np.ceil(np.log2(np.maximum(size, 1))).astype(np.int64)
+    for kb in np.unique(kbits[on]).tolist():
+        k = 1 << kb
+        ids = np.flatnonzero(on & (kbits == kb))
+        step = max(1, FRAG_BUDGET // (k*k))
+        cell = np.arange(k*k)
+        gx, gy = cell % k, cell // k
+        for s in range(0, len(ids), step):
+            i = ids[s:s+step]
+            px = x0[i,None] + gx
+            py = y0[i,None] + gy
+            cx, cy = px + 0.5, py + 0.5
+            xa, xb, xc = x[i,0,None], x[i,1,None], x[i,2,None]
+            ya, yb, yc = y[i,0,None], y[i,1,None], y[i,2,None]
+            inv = 1.0/area[i,None]
+            l0 = ((xc-xb)*(cy-yb) - (yc-yb)*(cx-xb))*inv
+            l1 = ((xa-xc)*(cy-yc) - (ya-yc)*(cx-xc))*inv
+            l2 = 1.0 - l0 - l1
+            m = (l0 >= 0) & (l1 >= 0) & (l2 >= 0) & \
+                (px <= x1[i,None]) & (py <= y1[i,None])
+            if not m.any(): continue
+            fz  = (l0*iz[i,0,None] + l1*iz[i,1,None] + l2*iz[i,2,None])[m]
+            pix = (py*w + px)[m]
+            tri = np.broadcast_to(i[:,None], m.shape)[m]
+            # Le plus proche par pixel dans le lot, puis contre le z-buffer
+            o = np.lexsort((-fz, pix))
+            pix, fz, tri = pix[o], fz[o], tri[o]
+            first = np.ones(len(pix), bool)
+            first[1:] = pix[1:] != pix[:-1]
+            pix, fz, tri = pix[first], fz[first], tri[first]
+            win = fz > zbuf[pix]
+            zbuf[pix[win]] = fz[win]
+            flat[pix[win]] = rgb[tri[win]]
+    return img
+
+
+def background(w, h, bg, grid=None, spacing=40):
+    """Image de fond (h,w,3) avec la grille de la visionneuse."""
+    img = np.empty((h, w, 3), np.uint8)
+    img[:] = hex_to_rgb(bg)
+    if grid:
+        img[::spacing, :] = hex_to_rgb(grid)
+        img[:, ::spacing] = hex_to_rgb(grid)
+    return img
+
+
+def render_raster(scene, rot_x, rot_y, zoom, pan_x, pan_y, w, h, bg, grid=None, scale=1,
+                  prof=None):
+    """
+    Image RGB (h,w,3) de la scene, rendue avec z-buffer. scale > 1 rend en
+    resolution reduite puis agrandit (apercu pendant l'interaction).
+    """
+    if scale > 1:
+        sw, sh = -(-w//scale), -(-h//scale)
+        img = render_raster(scene, rot_x, rot_y, zoom/scale, pan_x/scale, pan_y/scale,
+                            sw, sh, bg, None, prof=prof)
+        with _stage(prof, 'upscale'):
+            img = img.repeat(scale, axis=0).repeat(scale, axis=1)[:h, :w]
+            if grid:
+                # Grille nette (pas agrandie), seulement sur le fond
+                bgc = np.array(hex_to_rgb(bg), np.uint8)
+                for part in (img[::40, :], img[:, ::40]):
+                    part[(part == bgc).all(axis=-1)] = hex_to_rgb(grid)
+        return img
+    with _stage(prof, 'raster'):
+        img = background(w, h, bg, grid)
+    keep, x, y, z = screen_tris(scene, rot_x, rot_y, zoom, pan_x, pan_y, w, h, prof)
+    with _stage(prof, 'raster'):
+        if len(keep):
+            rasterize(x, y, z, scene['rgb'][keep], img)
+    return img
+
+
+def to_ppm(img):
+    """Encode une image RGB en PPM binaire (lisible par tk.PhotoImage)."""
+    h, w = img.shape[:2]
+    return b'P6\n%d %d\n255\n' % (w, h) + np.ascontiguousarray(img).tobytes()
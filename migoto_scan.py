@@ -0,0 +1,131 @@
+"""
+Index rapide des dossiers de dumps (FrameAnalysis 3DMigoto, mods).
+Un seul parcours os.scandir, empreinte des .ib/.buf en parallele, regroupement
+par draw call et detection des draw calls au contenu identique (meme .ib et
+memes .buf). L'index est garde dans le dossier de cache : un nouveau
+parcours ne relit que les fichiers dont la taille ou la date a change.
+"""
+
+import os, re, json, hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+import migoto_decode
+import migoto_manifest
+
+INDEX_VERSION = 1
+DATA_EXTS = ('.ib', '.buf')
+META_EXTS = ('.ini', '.fmt', '.txt')
+WORKERS   = 8
+
+_RE_IB_HASH = re.compile(r'-ib=([0-9a-f]+)', re.I)
+
+
+def index_path(folder):
+    """Fichier d'index d'un dossier (dans le dossier de cache)."""
+    key = hashlib.blake2b(os.path.abspath(folder).encode('utf-8'), digest_size=8).hexdigest()
+    return migoto_decode.cache_path(f"scan-{key}.json")
+
+
+def _load(folder):
+    try:
+        with open(index_path(folder), encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get('version') != INDEX_VERSION or data.get('folder') != os.path.abspath(folder):
+        return {}
+    return data.get('files', {})
+
+
+def _save(folder, files):
+    path = index_path(folder)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'version': INDEX_VERSION, 'folder': os.path.abspath(folder),
+                   'files': files}, f)
+    os.replace(tmp, path)
+
+
+def _draw(key, names, files):
+    """Draw call : son .ib, ses .buf (par slot), ses fichiers de layout."""
+    ib   = next(n for n in names if migoto_decode._is_ib(n))
+    bufs = sorted((n for n in names if migoto_decode._is_vb(n) and n != ib),
+                  key=migoto_decode._slot)
+    meta = [n for n in names if n.lower().endswith(META_EXTS)]
+    m = _RE_IB_HASH.search(ib)
+    h = hashlib.blake2b(digest_size=16)
+    for n in [ib] + bufs:
+        h.update(f"{migoto_decode._slot(n) if n != ib else 'ib'}:{files[n]['hash']};".encode())
+    return {'key': key, 'ib': ib, 'bufs': bufs, 'meta': meta,
+            'ib_hash': m.group(1).lower() if m else None,
+            'bytes': sum(files[n]['size'] for n in [ib] + bufs),
+            'content': h.hexdigest(), 'dup_of': None}
+
+
+def group(files):
+    """Draw calls (tries par cle) ; dup_of = premier draw call au contenu identique."""
+    by_key = {}
+    for n in files:
+        by_key.setdefault(migoto_decode.group_key(n), []).append(n)
+    draws, first = [], {}
+    for key in sorted(by_key):
+        names = sorted(by_key[key])
+        if not any(migoto_decode._is_ib(n) for n in names):
+            continue
+        d = _draw(key, names, files)
+        d['dup_of'] = first.setdefault(d['content'], key)
+        if d['dup_of'] == key: d['dup_of'] = None
+        draws.append(d)
+    return draws
+
+
+def scan(folder, workers=WORKERS, log=print):
+    """
+    Indexe le dossier. Retourne {'folder', 'files': {nom: {'size', 'mtime',
+    'hash'}}, 'draws': [...], 'hashed': fichiers relus}. Seuls les .ib/.buf
+    ont une empreinte ; les fichiers de layout n'ont que taille et date.
+    """
+    known = _load(folder)
+    files, todo, changed = {}, [], 0
+    with os.scandir(folder) as it:
+        for e in it:
+            low = e.name.lower()
+            if not low.endswith(DATA_EXTS + META_EXTS) or not e.is_file():
+                continue
+            st = e.stat()
+            prev = known.get(e.name)
+            if prev and prev['size'] == st.st_size and prev['mtime'] == st.st_mtime_ns:
+                files[e.name] = prev
+                continue
+            files[e.name] = {'size': st.st_size, 'mtime': st.st_mtime_ns, 'hash': None}
+            changed += 1
+            if low.endswith(DATA_EXTS):
+                todo.append(e.name)
+    if todo:
+        paths = [os.path.join(folder, n) for n in todo]
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(todo)))) as pool:
+            for n, h in zip(todo, pool.map(migoto_manifest.file_hash, paths)):
+                files[n]['hash'] = h
+    if changed or len(files) != len(known):
+        try:
+            _save(folder, files)
+        except OSError as e:
+            log(f"[WARN] Index non enregistre : {e}")
+    draws = group(files)
+    data = [f['hash'] for f in files.values() if f['hash']]
+    dups = sum(d['dup_of'] is not None for d in draws)
+    log(f"[OK] {len(files)} fichiers ({len(todo)} relus), {len(data) - len(set(data))} buffers "
+        f"en double, {len(draws)} draw calls dont {dups} identiques")
+    return {'folder': folder, 'files': files, 'draws': draws, 'hashed': len(todo)}
+
+
+def unique_keys(draws):
+    """Cles des draw calls a convertir (un seul par contenu)."""
+    return [d['key'] for d in draws if d['dup_of'] is None]
+
+
+def describe(draw, copies=0):
+    """Ligne d'affichage d'un draw call."""
+    ib = f"ib={draw['ib_hash']}" if draw['ib_hash'] else draw['ib']
+    text = f"{draw['key']}  {ib}  {len(draw['bufs'])} vb  {draw['bytes']/1024:.0f} Ko"
+    return text + (f"  x{copies + 1}" if copies else '')
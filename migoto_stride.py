@@ -0,0 +1,182 @@
+"""
+Detection automatique du stride d'un .buf.
+Chaque stride candidat est note d'apres les indices : declarations .ini /
+.fmt, divisibilite de la taille, indice max de l'.ib contre le nombre de
+sommets, vraisemblance des positions/normales decodees sur un echantillon.
+Les resultats sont gardes sur disque, par empreinte du contenu.
+"""
+
+import os, json, time, hashlib, threading
+
+import numpy as np
+
+import migoto_decode
+
+CANDIDATES = tuple(range(12, 132, 4))
+SAMPLES    = 2048      # sommets lus par candidat
+RUN        = 8         # sommets consecutifs par bloc (coherence spatiale)
+CACHE_FILE = 'strides.json'
+SAVE_DELAY = 5.0       # s entre deux ecritures du cache pendant une detection
+
+_lock  = threading.Lock()
+_cache = None
+_dirty = False
+_saved = 0.0
+
+
+# =============================================================================
+# EMPREINTE + CACHE DISQUE
+# =============================================================================
+
+def content_key(path, block=1 << 16):
+    """
+    Empreinte du contenu : fichier entier s'il est petit, sinon taille +
+    debut, milieu et fin. Quelques ms meme pour des centaines de Mo.
+    """
+    size = os.path.getsize(path)
+    h = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(path, 'rb') as f:
+        if size <= 16*block:
+            h.update(f.read())
+        else:
+            for off in (0, size//2 - block//2, size - block):
+                f.seek(off)
+                h.update(f.read(block))
+    return h.hexdigest()
+
+
+def _load():
+    global _cache
+    if _cache is None:
+        try:
+            with open(migoto_decode.cache_path(CACHE_FILE), encoding='utf-8') as f:
+                _cache = json.load(f)
+        except (OSError, ValueError):
+            _cache = {}
+    return _cache
+
+
+def _save():
+    global _dirty, _saved
+    path = migoto_decode.cache_path(CACHE_FILE)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(_cache, f)
+    os.replace(tmp, path)
+    _dirty, _saved = False, time.monotonic()
+
+
+def flush():
+    """Ecrit le cache s'il a change (fin d'un passage de detection)."""
+    with _lock:
+        if not _dirty: return
+        try: _save()
+        except OSError as e: print(f"Cache stride: {e}")
+
+
+# =============================================================================
+# NOTATION
+# =============================================================================
+
+def index_max(ib_path, fmt=None, max_verts=None):
+    """Indice max d'un .ib ; R16 si R32 donnerait plus de sommets que possible."""
+    size = os.path.getsize(ib_path)
+    if size < 2:
+        return -1
+    if fmt is None:
+        fmt = 'R16_UINT' if size % 4 else 'R32_UINT'
+        if fmt == 'R32_UINT' and max_verts is not None:
+            m = int(np.memmap(ib_path, dtype='<u4', mode='r').max())
+            if m < max_verts: return m
+            fmt = 'R16_UINT'
+    dt = migoto_decode.INDEX_FORMATS.get(fmt, '<u4')
+    return int(np.memmap(ib_path, dtype=dt, mode='r',
+                         shape=(size // np.dtype(dt).itemsize,)).max())
+
+
+def _sample(raw, stride, n, width):
+    """width octets en tete de SAMPLES sommets (blocs consecutifs) -> float32."""
+    blocks = max(1, min(SAMPLES // RUN, n // RUN))
+    starts = np.linspace(0, max(0, n - RUN), blocks).astype(np.int64)
+    verts  = (starts[:, None] + np.arange(min(RUN, n))).ravel()
+    offs   = verts[:, None]*stride + np.arange(width)
+    return raw[offs].view('<f4').reshape(len(starts), -1, width // 4)
+
+
+def _plausible(v):
+    """Part des valeurs finies, ni enormes ni denormales."""
+    a = np.abs(v)
+    ok = np.isfinite(v) & (a < 1e5) & ((a == 0) | (a > 1e-20))
+    return float(ok.all(axis=-1).mean())
+
+
+def score_strides(buf_path, ib_max=-1, declared=None, candidates=CANDIDATES):
+    """Note de chaque stride candidat (None = exclu)."""
+    size = os.path.getsize(buf_path)
+    raw  = np.memmap(buf_path, dtype=np.uint8, mode='r') if size else np.zeros(0, np.uint8)
+    scores = {}
+    for s in candidates:
+        n = size // s
+        if n == 0 or size % s or ib_max >= n:
+            scores[s] = None
+            continue
+        score = 0.0
+        if declared and s == declared:
+            score += 5
+        if ib_max >= 0:
+            score += 3*(ib_max + 1)/n          # l'.ib doit couvrir tout le buffer
+        width = 24 if s >= 24 else 12
+        smp = _sample(raw, s, n, width)
+        with np.errstate(all='ignore'):
+            scores[s] = score + _float_score(smp)
+    return scores
+
+
+def _float_score(smp):
+    """Vraisemblance des floats lus : positions, coherence, normales unitaires."""
+    pos = smp[..., :3]
+    score = 3*_plausible(pos)
+    # Coherence : des sommets voisins sont proches dans un vrai mesh
+    if smp.shape[1] > 1 and np.isfinite(pos).all():
+        ext  = float(np.ptp(pos.reshape(-1, 3), axis=0).max()) or 1.0
+        step = float(np.median(np.abs(np.diff(pos, axis=1)).max(axis=-1)))
+        score += 2*(1 - min(1.0, 5*step/ext))
+    if smp.shape[-1] >= 6:
+        nrm  = smp[..., 3:6]
+        unit = np.abs(np.sqrt((nrm*nrm).sum(axis=-1)) - 1) < 0.05
+        score += 2*float(unit.mean())
+    return score
+
+
+def detect_stride(buf_path, ib_paths=(), declared=None, ib_format=None, use_cache=True):
+    """
+    Meilleur stride pour buf_path (ou None). Resultat mis en cache par
+    empreinte du .buf et des .ib utilises.
+    """
+    key = '|'.join([content_key(buf_path)] + [content_key(p) for p in ib_paths]
+                   + [str(declared or ''), ib_format or ''])
+    if use_cache:
+        with _lock:
+            hit = _load().get(key)
+        if hit is not None:
+            return hit
+    size = os.path.getsize(buf_path)
+    ib_max = max((index_max(p, ib_format, size // min(CANDIDATES)) for p in ib_paths),
+                 default=-1)
+    scores = {s: v for s, v in score_strides(buf_path, ib_max, declared).items()
+              if v is not None}
+    # Un multiple du vrai stride lit aussi des floats plausibles : a note
+    # quasi egale, le plus petit l'emporte
+    top  = max(scores.values(), default=None)
+    best = min((s for s, v in scores.items() if v >= top - 0.5), default=None)
+    if use_cache:
+        global _dirty
+        with _lock:
+            _load()[key] = best
+            _dirty = True
+            # Reecrire tout le fichier a chaque buffer serait quadratique :
+            # au plus une ecriture par SAVE_DELAY, le reste au flush()
+            if time.monotonic() - _saved >= SAVE_DELAY:
+                try: _save()
+                except OSError as e: print(f"Cache stride: {e}")
+    return best
@@ -0,0 +1,168 @@
+"""
+Processus de conversion persistant pour le moteur script.
+Le script (migoto_to_fbx.py) est charge une fois dans un processus qui
+reste vivant : les conversions suivantes ne paient plus le demarrage de
+l'interpreteur ni les imports. Protocole sur un Pipe multiprocessing :
+
+  -> {'id', 'script', 'argv', 'out_dir'}
+  <- {'id', 'event': 'line', 'text'}                     (sortie du script)
+  <- {'id', 'event': 'done', 'returncode', 'outputs'}
+
+Le processus est relance s'il meurt ou si le fichier du script change.
+"""
+
+import io, os, sys, time, runpy, threading, traceback, importlib.util, multiprocessing
+
+import migoto_batch
+from migoto_cache import file_key
+
+
+# =============================================================================
+# COTE PROCESSUS DE TRAVAIL
+# =============================================================================
+
+class _Lines(io.TextIOBase):
+    """stdout/stderr du script -> evenements 'line' du travail en cours."""
+
+    def __init__(self, conn):
+        self.conn, self.job, self._buf = conn, None, ''
+
+    def writable(self):
+        return True
+
+    def write(self, s):
+        self._buf += s
+        *lines, self._buf = self._buf.split('\n')
+        for line in lines:
+            self.conn.send({'id': self.job, 'event': 'line', 'text': line})
+        return len(s)
+
+    def flush(self):
+        if self._buf:
+            self.conn.send({'id': self.job, 'event': 'line', 'text': self._buf})
+            self._buf = ''
+
+
+def _load(script):
+    """Module du script, charge sans l'executer comme __main__ (None si impossible)."""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+    spec = importlib.util.spec_from_file_location('_migoto_script', script)
+    mod = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(mod)
+    except (Exception, SystemExit):
+        traceback.print_exc()
+        return None
+    return mod
+
+
+def _run(mod, script, argv):
+    """Une conversion : main() du module s'il existe, sinon le script comme __main__."""
+    sys.argv = [script] + list(argv)
+    try:
+        if mod is not None and callable(getattr(mod, 'main', None)):
+            rc = mod.main()
+        else:
+            runpy.run_path(script, run_name='__main__')
+            rc = 0
+    except SystemExit as e:
+        if isinstance(e.code, str):
+            print(e.code)
+        rc = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except Exception:
+        traceback.print_exc()
+        rc = 1
+    return rc if isinstance(rc, int) else 0
+
+
+def serve(conn, script):
+    """Boucle du processus de travail (cible de multiprocessing.Process)."""
+    out = _Lines(conn)
+    sys.stdout = sys.stderr = out
+    mod = _load(script)
+    out.flush()
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            return
+        if job is None:
+            return
+        out.job = job['id']
+        started = time.time()
+        rc = _run(mod, job['script'], job['argv'])
+        out.flush()
+        conn.send({'id': job['id'], 'event': 'done', 'returncode': rc,
+                   'outputs': migoto_batch.script_outputs(job['out_dir'], started) if rc == 0 else []})
+
+
+# =============================================================================
+# COTE APPLICATION
+# =============================================================================
+
+class ScriptWorker:
+    """Client du processus persistant ; un travail a la fois (verrou)."""
+
+    def __init__(self, log=print):
+        self.log    = log
+        self._proc  = None
+        self._conn  = None
+        self._stamp = None
+        self._next  = 0
+        self._lock  = threading.Lock()
+
+    def _start(self, script):
+        self.close()
+        ctx = multiprocessing.get_context('spawn')
+        self._conn, child = ctx.Pipe()
+        self._proc = ctx.Process(target=serve, args=(child, script), daemon=True)
+        self._proc.start()
+        child.close()
+        self._stamp = file_key(script)
+        self.log(f"[OK] Processus de conversion demarre (pid {self._proc.pid})")
+
+    def _ensure(self, script):
+        if self._proc is None or not self._proc.is_alive():
+            if self._proc is not None:
+                self.log("[WARN] Processus de conversion arrete, redemarrage")
+            self._start(script)
+        elif self._stamp != file_key(script):
+            self.log("[OK] Script modifie, redemarrage du processus de conversion")
+            self._start(script)
+
+    def run(self, script, argv, out_dir, on_line=print):
+        """
+        Convertit avec le script dans le processus persistant.
+        on_line(texte) recoit la sortie au fil de l'eau ; retourne
+        (code de retour, fichiers produits).
+        """
+        with self._lock:
+            self._ensure(script)
+            self._next += 1
+            job = self._next
+            try:
+                self._conn.send({'id': job, 'script': script, 'argv': list(argv),
+                                 'out_dir': out_dir})
+                while True:
+                    msg = self._conn.recv()
+                    if msg['event'] == 'line':
+                        if msg['text'].strip(): on_line(msg['text'])
+                    elif msg['event'] == 'done' and msg['id'] == job:
+                        return msg['returncode'], msg['outputs']
+            except (EOFError, OSError, BrokenPipeError) as e:
+                # Mort en cours de travail : relance au prochain appel
+                self._proc.join(1)
+                code = self._proc.exitcode
+                self._proc = None
+                raise RuntimeError(f"processus de conversion mort (code {code})") from e
+
+    def close(self):
+        if self._proc is not None and self._proc.is_alive():
+            try:
+                self._conn.send(None)
+            except OSError:
+                pass
+            self._proc.join(2)
+            if self._proc.is_alive():
+                self._proc.terminate()
+        self._proc = self._conn = None